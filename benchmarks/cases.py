@@ -0,0 +1,201 @@
+import random
+from datetime import datetime, timedelta, timezone
+
+from benchmarks import synthetic
+from benchmarks.fakes import FakeBot, FakeChannel, FakeContext, FakeInteraction, FakeMessage, FakeUser
+
+# name -> setup coroutine function taking the dataset scale
+CASES = {}
+# Datasets reused by several cases of one cog; the runner clears this when it moves on to another cog
+SHARED = {}
+
+
+class Workload:
+    """What a case's setup hands back: the timed call and its untimed preparation.
+
+    run(i) is timed; prepare(i), when given, runs before it outside the
+    timer. Each run performs `ops` operations, and results are reported
+    per operation.
+    """
+
+    def __init__(self, run, prepare=None, iterations=200, ops=1, dataset=None):
+        self.run = run
+        self.prepare = prepare
+        self.iterations = iterations
+        self.ops = ops
+        self.dataset = dataset or {}
+
+
+def case(name):
+    def decorator(setup):
+        CASES[name] = setup
+        return setup
+    return decorator
+
+
+def crew_member(rank, user_id=None, name=None):
+    roles = {'Student': (), 'Trainer': ('Trainer',), 'Command': ('Command',)}[rank]
+    user_id = user_id or 300_000_000_000_000_000 + random.randrange(1_000_000)
+    return FakeUser(user_id, name or f"{rank} User", roles)
+
+
+@case('help.search_knowledge')
+async def search_knowledge(scale):
+    from cogs.help_system import HelpSystemCog
+    cog = HelpSystemCog(FakeBot())
+    topics = synthetic.scaled(synthetic.TOPICS, scale)
+    knowledge_base = synthetic.knowledge_base(topics)
+    cog.knowledge_base = knowledge_base
+    cog.search_index, cog.topic_trie = cog.build_search_index(knowledge_base)
+    queries = synthetic.queries(1000)
+
+    async def run(i):
+        cog.search_knowledge(queries[i % len(queries)])
+
+    return Workload(run, iterations=1000, dataset={'topics': topics})
+
+
+async def missions_cog(scale):
+    """MissionsCog indexed the way load_missions does it, minus the JSON parse"""
+    from cogs.missions import MissionsCog
+    cog = MissionsCog(FakeBot())
+    cog.db = None
+    cog.missions = synthetic.missions(synthetic.scaled(synthetic.MISSIONS, scale))
+    for mission in cog.missions.values():
+        cog.leaderboard_index.add_mission(mission)
+    cog.index_user_missions()
+    cog.build_autocomplete()
+    return cog
+
+
+async def shared_missions_cog(scale):
+    # Generating and indexing a million missions is the slowest setup; do it once
+    key = ('missions', scale)
+    if key not in SHARED:
+        SHARED[key] = await missions_cog(scale)
+    return SHARED[key]
+
+
+async def leaderboard_workload(scale, variants, iterations, activity=False):
+    cog = await shared_missions_cog(scale)
+    ctx = FakeContext(crew_member('Student'))
+    crew = synthetic.pilots()
+    rng = random.Random(5)
+
+    def prepare(i):
+        # A mission ending today, as between two real !leaderboard calls; zero deltas keep the shared data unchanged
+        user_id, name = crew[rng.randrange(len(crew))]
+        cog.leaderboard_index.bump(user_id, name, datetime.now(timezone.utc).date().isoformat(), minutes=0)
+
+    async def run(i):
+        ranking, days = variants[i % len(variants)]
+        await cog.leaderboard.callback(cog, ctx, ranking, days)
+
+    return Workload(run, prepare if activity else None, iterations=iterations, dataset={'missions': len(cog.missions)})
+
+
+@case('missions.leaderboard')
+async def leaderboard(scale):
+    return await leaderboard_workload(scale, [('missions', None), ('success', None), ('minutes', None)], 300)
+
+
+# Windowed rankings re-rank their window's running totals after any change; timed apart so neither hides the other
+@case('missions.leaderboard_window')
+async def leaderboard_window(scale):
+    return await leaderboard_workload(scale, [('missions', 7), ('success', 30), ('minutes', 90)], 300, activity=True)
+
+
+@case('missions.mission_history')
+async def mission_history(scale):
+    cog = await shared_missions_cog(scale)
+    crew = synthetic.pilots()
+    rng = random.Random(7)
+
+    async def run(i):
+        user_id, name = crew[rng.randrange(len(crew))]
+        ctx = FakeContext(crew_member('Student', user_id, name))
+        # Alternate between your own history and a lookup by pilot name
+        await cog.mission_history.callback(cog, ctx, None if i % 2 else name)
+
+    return Workload(run, iterations=500, dataset={'missions': len(cog.missions)})
+
+
+@case('documents.docs')
+async def docs(scale):
+    from cogs.documents import DocumentsCog
+    cog = DocumentsCog(FakeBot())
+    cog.db = None
+    for doc in synthetic.documents(synthetic.scaled(synthetic.DOCUMENTS, scale)):
+        cog.index_document(doc)
+    searches = [None, None] + synthetic.queries(50, seed=8)
+    users = [crew_member(rank) for rank in ('Student', 'Trainer', 'Command')]
+    interactions = {}
+
+    def prepare(i):
+        interactions[i] = FakeInteraction(users[i % len(users)])
+
+    async def run(i):
+        await cog.docs.callback(cog, interactions.pop(i), searches[i % len(searches)])
+
+    return Workload(run, prepare, iterations=200, dataset={'documents': len(cog.documents)})
+
+
+REMINDER_BATCH = 500
+
+
+@case('reminders.reminder_check')
+async def reminder_check(scale):
+    from cogs.reminders import RemindersCog
+    bot = FakeBot()
+    cog = RemindersCog(bot)
+    cog.db = None
+    # The snapshot write runs in a worker thread; keep it out of the timings
+    cog.store.delay = 3600
+    cog.reminders = synthetic.reminders(synthetic.scaled(synthetic.REMINDERS, scale))
+    for reminder_id, reminder in cog.reminders.items():
+        cog.timers.schedule(reminder_id, cog.reminder_timestamp(reminder))
+        cog.reminder_trie.insert(f"{reminder_id} {reminder['message']}", reminder_id)
+    ids = list(cog.reminders)
+    batch = min(REMINDER_BATCH, len(ids))
+    rng = random.Random(9)
+
+    def prepare(i):
+        # Make a batch due now, as if the scheduler had slept until then
+        due = (datetime.now(timezone.utc) - timedelta(seconds=1))
+        for reminder_id in rng.sample(ids, batch):
+            reminder = cog.reminders[reminder_id]
+            reminder['active'] = True
+            reminder['reminder_time'] = due.isoformat()
+            cog.timers.schedule(reminder_id, due.timestamp())
+            if reminder_id not in cog.reminder_trie:
+                cog.reminder_trie.insert(f"{reminder_id} {reminder['message']}", reminder_id)
+
+    async def run(i):
+        await cog.reminder_check()
+
+    return Workload(run, prepare, iterations=50, ops=batch,
+                    dataset={'reminders': len(cog.reminders), 'due_per_check': batch})
+
+
+@case('alerts.on_message')
+async def on_message(scale):
+    from cogs.alerts import AlertsCog
+    cog = AlertsCog(FakeBot())
+    cog.load_data()
+    messages = synthetic.messages(10_000)
+    channels = [FakeChannel(200_000_000_000_000_000 + i) for i in range(synthetic.CHANNELS)]
+    batch = 100
+    authors = iter(range(10**9))
+    pending = {}
+
+    def prepare(i):
+        # Fresh authors, so repeat-trigger suppression doesn't turn every alert into a no-op
+        pending[i] = [FakeMessage(messages[(i * batch + n) % len(messages)],
+                                  FakeUser(next(authors), "Pilot"),
+                                  channels[(i * batch + n) % len(channels)]) for n in range(batch)]
+
+    async def run(i):
+        for message in pending.pop(i):
+            await cog.on_message(message)
+
+    return Workload(run, prepare, iterations=100, ops=batch, dataset={'messages': len(messages), 'alert_ratio': 0.05})
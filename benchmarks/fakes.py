@@ -0,0 +1,123 @@
+import itertools
+
+# Minimal stand-ins for the discord.py objects the cogs touch. Anything
+# that would go over the wire is serialized the way discord.py would
+# (embeds via to_dict()) and then dropped, so that cost is measured but
+# nothing accumulates across iterations.
+
+_ids = itertools.count(900_000_000_000_000_000)
+
+
+def _serialize(embed=None, embeds=None, view=None):
+    payload = [item.to_dict() for item in (embeds or ([embed] if embed else []))]
+    if view is not None:
+        payload.append(view.to_components())
+    return payload
+
+
+class FakeRole:
+    def __init__(self, name):
+        self.name = name
+
+
+class FakeUser:
+    def __init__(self, user_id, name, roles=()):
+        self.id = int(user_id)
+        self.name = name
+        self.display_name = name
+        self.mention = f"<@{self.id}>"
+        self.roles = [FakeRole(role) for role in roles]
+        self.bot = False
+
+    def __str__(self):
+        return self.name
+
+
+class FakeMessage:
+    def __init__(self, content='', author=None, channel=None):
+        self.id = next(_ids)
+        self.content = content
+        self.author = author
+        self.channel = channel
+        self.guild = None
+
+    async def add_reaction(self, emoji):
+        pass
+
+    async def pin(self):
+        pass
+
+    async def edit(self, content=None, embed=None, embeds=None, view=None):
+        _serialize(embed, embeds, view)
+        return self
+
+
+class FakeChannel:
+    def __init__(self, channel_id):
+        self.id = int(channel_id)
+        self.sent = 0
+
+    async def send(self, content=None, embed=None, embeds=None, view=None, **kwargs):
+        _serialize(embed, embeds, view)
+        self.sent += 1
+        return FakeMessage(content or '', channel=self)
+
+
+class FakeResponse:
+    def __init__(self):
+        self.done = False
+
+    def is_done(self):
+        return self.done
+
+    async def send_message(self, content=None, embed=None, embeds=None, view=None, **kwargs):
+        _serialize(embed, embeds, view)
+        self.done = True
+
+    async def defer(self, **kwargs):
+        self.done = True
+
+    async def edit_message(self, content=None, embed=None, embeds=None, view=None):
+        _serialize(embed, embeds, view)
+
+
+class FakeInteraction:
+    def __init__(self, user, channel=None):
+        self.id = next(_ids)
+        self.user = user
+        self.channel = channel or FakeChannel(next(_ids))
+        self.response = FakeResponse()
+        self.followup = self.channel
+        self.extras = {}
+
+    async def original_response(self):
+        return FakeMessage(channel=self.channel)
+
+
+class FakeContext:
+    """Prefix command context; hybrid commands see interaction=None, as when run with !"""
+
+    def __init__(self, author, channel=None):
+        self.author = author
+        self.channel = channel or FakeChannel(next(_ids))
+        self.message = FakeMessage(author=author, channel=self.channel)
+        self.interaction = None
+
+    async def send(self, content=None, embed=None, embeds=None, view=None, **kwargs):
+        return await self.channel.send(content, embed=embed, embeds=embeds, view=view)
+
+
+class FakeBot:
+    def __init__(self):
+        self.channels = {}
+        self.guilds = []
+        self.latency = 0.05
+
+    def get_channel(self, channel_id):
+        channel = self.channels.get(channel_id)
+        if channel is None:
+            channel = self.channels[channel_id] = FakeChannel(channel_id)
+        return channel
+
+    async def wait_until_ready(self):
+        pass
@@ -0,0 +1,407 @@
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import random
+import shutil
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+import discord
+from discord.webhook.async_ import AsyncWebhookAdapter, async_context
+
+from benchmarks import synthetic
+from benchmarks.run import SHARED_DATA, prepare_workdir
+from utils.gateway_trace import read_trace
+
+# Data files copied into the scratch directory, so cogs start with the real knowledge base and documents
+REPLAY_DATA = SHARED_DATA + ('ems_knowledge.json', 'documents.json', 'users.json')
+
+# How often the loop-lag probe wakes up
+LAG_PROBE_SECONDS = 0.005
+# Heartbeat latency the mocked gateway reports
+GATEWAY_LATENCY = 0.05
+
+APPLICATION_ID = 1_100_000_000_000_000_000
+BOT_USER_ID = 1_100_000_000_000_000_001
+GUILD_ID = 1_200_000_000_000_000_000
+TRAINER_ROLE_ID = GUILD_ID + 1
+COMMAND_ROLE_ID = GUILD_ID + 2
+
+_snowflakes = itertools.count(1_300_000_000_000_000_000)
+
+
+def snowflake():
+    return str(next(_snowflakes))
+
+
+def now_iso():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def user_payload(user_id, name, bot=False):
+    return {'id': str(user_id), 'username': name, 'global_name': name, 'discriminator': '0', 'avatar': None, 'bot': bot}
+
+
+def message_payload(channel_id, author, content, embeds=(), guild_id=None):
+    payload = {
+        'id': snowflake(), 'channel_id': str(channel_id), 'author': author, 'content': content,
+        'timestamp': now_iso(), 'edited_timestamp': None, 'tts': False, 'mention_everyone': False,
+        'mentions': [], 'mention_roles': [], 'attachments': [], 'embeds': list(embeds), 'pinned': False, 'type': 0
+    }
+    if guild_id:
+        payload['guild_id'] = str(guild_id)
+    return payload
+
+
+class MockDiscordAPI:
+    """Answers REST and interaction-callback requests locally, with the payload shapes discord.py expects"""
+
+    def __init__(self):
+        self.calls = Counter()
+        self.bot_user = user_payload(BOT_USER_ID, 'EMS Bot', bot=True)
+
+    def respond(self, method, path, params, payload):
+        self.calls[f"{method} {path}"] += 1
+        payload = payload or {}
+        if path.endswith('/callback'):
+            return {'interaction': {'id': params.get('webhook_id'), 'type': 2}}
+        if path.startswith('/webhooks/') and method != 'DELETE' or method in ('POST', 'PATCH') and '/messages' in path:
+            return message_payload(params.get('channel_id') or snowflake(), self.bot_user,
+                                   payload.get('content') or '', payload.get('embeds') or ())
+        return None
+
+    async def request(self, route, *, files=None, form=None, **kwargs):
+        return self.respond(route.method, route.path, self._route_params(route), kwargs.get('json'))
+
+    @staticmethod
+    def _route_params(route):
+        return {key: str(value) for key, value in vars(route).items()
+                if value is not None and (key.endswith('_id') or key.endswith('_token'))}
+
+
+class MockGateway:
+    """Stands in for bot.ws, so /status and /health see a heartbeat latency instead of NaN"""
+
+    latency = GATEWAY_LATENCY
+    open = False
+
+    def is_ratelimited(self):
+        return False
+
+
+class MockWebhookAdapter(AsyncWebhookAdapter):
+    """Interaction responses and followups go through the webhook adapter, not HTTPClient"""
+
+    def __init__(self, api):
+        super().__init__()
+        self.api = api
+
+    async def request(self, route, session=None, *, payload=None, **kwargs):
+        return self.api.respond(route.method, route.path, MockDiscordAPI._route_params(route), payload)
+
+
+def guild_payload(members, channels):
+    everyone = {'id': str(GUILD_ID), 'name': '@everyone', 'permissions': '0', 'position': 0, 'color': 0,
+                'hoist': False, 'managed': False, 'mentionable': False}
+    roles = [everyone,
+             {**everyone, 'id': str(TRAINER_ROLE_ID), 'name': 'Trainer', 'position': 1},
+             {**everyone, 'id': str(COMMAND_ROLE_ID), 'name': 'Command', 'position': 2}]
+    return {
+        'id': str(GUILD_ID), 'name': 'EMS Training', 'owner_id': str(BOT_USER_ID), 'unavailable': False,
+        'member_count': len(members), 'large': False, 'roles': roles, 'emojis': [], 'stickers': [],
+        'features': [], 'voice_states': [], 'presences': [], 'threads': [], 'stage_instances': [],
+        'guild_scheduled_events': [], 'soundboard_sounds': [],
+        'channels': [{'id': str(channel_id), 'type': 0, 'name': f"ops-{i}", 'position': i, 'permission_overwrites': []}
+                     for i, channel_id in enumerate(channels)],
+        'members': [{'user': user, 'roles': roles_, 'joined_at': now_iso(), 'deaf': False, 'mute': False, 'flags': 0}
+                    for user, roles_ in members]
+    }
+
+
+# (command name, options) for synthetic slash commands
+SLASH_COMMANDS = [
+    ('ask_ems', lambda rng: [{'name': 'question', 'type': 3, 'value': synthetic.words(rng, rng.randint(2, 5))}]),
+    ('ems_topics', lambda rng: []),
+    ('emergency_guide', lambda rng: []),
+    ('emergency_info', lambda rng: []),
+    ('docs', lambda rng: [{'name': 'search', 'type': 3, 'value': rng.choice(synthetic.VOCABULARY)}] if rng.random() < 0.5 else []),
+    ('help_ems', lambda rng: []),
+    ('status', lambda rng: [])
+]
+PREFIX_COMMANDS = ['!leaderboard', '!leaderboard success 30', '!mission_status', '!mission_history', '!reminders', '!doc_categories']
+
+
+def synthetic_trace(events, rate, seed=11, slash_ratio=0.1, prefix_ratio=0.1):
+    """Yield (at, event, payload): one GUILD_CREATE, then chat, alerts and commands at `rate` events/second"""
+    rng = random.Random(seed)
+    crew = synthetic.pilots(200)
+    members = [(user_payload(user_id, name), [str(rng.choice([TRAINER_ROLE_ID, COMMAND_ROLE_ID]))] if rng.random() < 0.2 else [])
+               for user_id, name in crew]
+    channels = [int(snowflake()) for _ in range(20)]
+    yield 0.0, 'GUILD_CREATE', guild_payload(members, channels)
+    chatter = synthetic.messages(events, seed=seed)
+    for i in range(events):
+        at = round(i / rate, 4)
+        user, roles = rng.choice(members)
+        member = {'roles': roles, 'joined_at': now_iso(), 'deaf': False, 'mute': False, 'flags': 0}
+        channel_id = rng.choice(channels)
+        roll = rng.random()
+        if roll < slash_ratio:
+            name, options = rng.choice(SLASH_COMMANDS)
+            yield at, 'INTERACTION_CREATE', {
+                'id': snowflake(), 'application_id': str(APPLICATION_ID), 'type': 2, 'token': f"token-{i}", 'version': 1,
+                'guild_id': str(GUILD_ID), 'channel_id': str(channel_id),
+                'channel': {'id': str(channel_id), 'type': 0, 'guild_id': str(GUILD_ID), 'name': 'ops', 'position': 0, 'permission_overwrites': []},
+                'member': {**member, 'user': user, 'permissions': '0'},
+                'data': {'id': snowflake(), 'name': name, 'type': 1, 'options': options(rng)},
+                'locale': 'en-US', 'guild_locale': 'en-US', 'app_permissions': '0', 'entitlements': [],
+                'authorizing_integration_owners': {'0': str(GUILD_ID)}, 'context': 0
+            }
+        else:
+            content = rng.choice(PREFIX_COMMANDS) if roll < slash_ratio + prefix_ratio else chatter[i]
+            yield at, 'MESSAGE_CREATE', {**message_payload(channel_id, user, content, guild_id=GUILD_ID), 'member': member}
+
+
+class LagProbe:
+    """Samples how late the loop wakes a short sleep, for a lag distribution rather than just a peak"""
+
+    def __init__(self, interval=LAG_PROBE_SECONDS):
+        self.interval = interval
+        self.samples = []
+        self.task = None
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(loop.time() - started - self.interval, 0.0))
+
+    def start(self):
+        self.task = asyncio.create_task(self.run())
+
+    def stop(self):
+        self.task.cancel()
+
+
+def percentile(samples, q):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+class Replayer:
+    """Feeds trace events through the bot's own gateway parsers and times the handlers each one starts"""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.parsers = bot._connection.parsers
+        self.collecting = None
+        self.latencies = {}  # event name -> seconds from arrival until its last handler finished
+        self.pending = set()
+        self.skipped = Counter()
+
+    def task_factory(self, loop, coro, **kwargs):
+        task = asyncio.Task(coro, loop=loop, **kwargs)
+        if self.collecting is not None:
+            self.collecting.append(task)
+        return task
+
+    def feed(self, event, payload):
+        if event == 'READY':
+            # Take identity from a recorded READY, but don't start discord.py's ready sequence without a gateway
+            state = self.bot._connection
+            state.user = discord.ClientUser(state=state, data=payload['user'])
+            state._users[state.user.id] = state.user
+            state.application_id = int(payload.get('application', {}).get('id', APPLICATION_ID))
+            return
+        parser = self.parsers.get(event)
+        if parser is None:
+            self.skipped[event] += 1
+            return
+        arrived = time.perf_counter()
+        self.collecting = []
+        try:
+            parser(payload)
+        finally:
+            tasks, self.collecting = self.collecting, None
+        if tasks:
+            self.pending.add(self.track(event, arrived, tasks))
+        else:
+            self.latencies.setdefault(event, []).append(time.perf_counter() - arrived)
+
+    def track(self, event, arrived, tasks):
+        async def wait():
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self.latencies.setdefault(event, []).append(time.perf_counter() - arrived)
+        task = asyncio.ensure_future(wait())
+        task.add_done_callback(self.pending.discard)
+        return task
+
+    async def replay(self, events, speed):
+        """Deliver events on their recorded schedule divided by speed; speed 0 means as fast as possible"""
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        count = 0
+        for at, event, payload in events:
+            if speed and at is not None:
+                delay = started + at / speed - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            self.feed(event, payload)
+            count += 1
+            # The gateway reader yields between frames too
+            await asyncio.sleep(0)
+        fed = loop.time() - started
+        await asyncio.gather(*list(self.pending), return_exceptions=True)
+        return count, fed, loop.time() - started
+
+
+async def build_bot(api):
+    from main import COGS, EMSBot
+    bot = EMSBot()
+    # What login() would do, minus the network: bind the loop, and mark the bot ready for the cogs' background tasks
+    await bot._async_setup_hook()
+    bot._ready.set()
+    bot.ws = MockGateway()
+    bot.http.request = api.request
+    state = bot._connection
+    state.user = discord.ClientUser(state=state, data=api.bot_user)
+    state._users[state.user.id] = state.user
+    state.application_id = APPLICATION_ID
+    await asyncio.gather(*(bot.load_cog(cog) for cog in COGS))
+    return bot
+
+
+def summarize(count, fed, elapsed, replayer, probe, watchdog, api):
+    from utils.metrics import metrics
+    events = {}
+    for event, samples in sorted(replayer.latencies.items()):
+        events[event] = {
+            'count': len(samples),
+            'p50_ms': round(percentile(samples, 0.5) * 1000, 3),
+            'p99_ms': round(percentile(samples, 0.99) * 1000, 3),
+            'max_ms': round(max(samples) * 1000, 3)
+        }
+    handlers = {f"{kind}:{name}": {
+        'calls': histogram.count,
+        'errors': metrics.errors[(kind, name)],
+        'p50_ms': round(histogram.quantile(0.5) * 1000, 3),
+        'p99_ms': round(histogram.quantile(0.99) * 1000, 3)
+    } for (kind, name), histogram in sorted(metrics.latency.items())}
+    return {
+        'events': count,
+        'feed_seconds': round(fed, 3),
+        'elapsed_seconds': round(elapsed, 3),
+        'throughput_per_second': round(count / elapsed, 1) if elapsed else None,
+        'latency': events,
+        'handlers': handlers,
+        'loop_lag_ms': {
+            'p50': round(percentile(probe.samples, 0.5) * 1000, 3),
+            'p99': round(percentile(probe.samples, 0.99) * 1000, 3),
+            'max': round(max(probe.samples, default=0.0) * 1000, 3),
+            'stalls': watchdog.stalls
+        },
+        'http_calls': dict(api.calls.most_common()),
+        'skipped_events': dict(replayer.skipped)
+    }
+
+
+def print_report(report):
+    print(f"Replayed {report['events']} events in {report['elapsed_seconds']:.2f}s "
+          f"({report['throughput_per_second']} events/s; fed over {report['feed_seconds']:.2f}s)")
+    print("\nEnd-to-end latency (arrival until every handler finished):")
+    for event, stats in report['latency'].items():
+        print(f"  {event:24} {stats['count']:>7}  p50 {stats['p50_ms']:>9.3f}ms  p99 {stats['p99_ms']:>9.3f}ms  max {stats['max_ms']:>9.3f}ms")
+    print("\nHandlers:")
+    for name, stats in report['handlers'].items():
+        errors = f"  {stats['errors']} errors" if stats['errors'] else ''
+        print(f"  {name:40} {stats['calls']:>7}  p50 {stats['p50_ms']:>9.3f}ms  p99 {stats['p99_ms']:>9.3f}ms{errors}")
+    lag = report['loop_lag_ms']
+    print(f"\nLoop lag: p50 {lag['p50']:.3f}ms  p99 {lag['p99']:.3f}ms  max {lag['max']:.3f}ms  stalls {lag['stalls']}")
+    print(f"Mocked HTTP calls: {sum(report['http_calls'].values())}")
+    if report['skipped_events']:
+        print(f"Skipped (no parser): {report['skipped_events']}")
+
+
+async def run(args):
+    from utils.watchdog import LoopWatchdog
+    api = MockDiscordAPI()
+    async_context.set(MockWebhookAdapter(api))
+    bot = await build_bot(api)
+    replayer = Replayer(bot)
+    asyncio.get_running_loop().set_task_factory(replayer.task_factory)
+
+    if args.trace:
+        events = list(read_trace(args.trace))
+        if any(at is None for at, _, _ in events):
+            events = [(i / args.rate if at is None else at, event, payload) for i, (at, event, payload) in enumerate(events)]
+    else:
+        events = list(synthetic_trace(args.events, args.rate))
+
+    probe, watchdog = LagProbe(), LoopWatchdog()
+    probe.start()
+    watchdog.start()
+    try:
+        count, fed, elapsed = await replayer.replay(events, args.speed)
+    finally:
+        probe.stop()
+        watchdog.stop()
+        asyncio.get_running_loop().set_task_factory(None)
+    report = summarize(count, fed, elapsed, replayer, probe, watchdog, api)
+    await bot.close()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay gateway traffic through the bot offline, against a mocked Discord API")
+    parser.add_argument('trace', nargs='?', help="JSON-lines trace (recorded with GATEWAY_TRACE_PATH); synthetic traffic if omitted")
+    parser.add_argument('--speed', type=float, default=1.0, help="Replay speed multiplier; 0 replays as fast as possible")
+    parser.add_argument('--events', type=int, default=5000, help="Synthetic events to generate")
+    parser.add_argument('--rate', type=float, default=50.0, help="Synthetic events per second at speed 1 (also spaces trace lines without timestamps)")
+    parser.add_argument('--write-trace', help="Write the synthetic trace here and exit")
+    parser.add_argument('--output', help="Write the report JSON here")
+    args = parser.parse_args()
+    if args.rate <= 0:
+        parser.error("--rate must be positive")
+
+    if args.write_trace:
+        with open(args.write_trace, 'w', encoding='utf-8') as f:
+            for at, event, payload in synthetic_trace(args.events, args.rate):
+                f.write(json.dumps({'at': at, 't': event, 'd': payload}, separators=(',', ':')) + '\n')
+        return 0
+
+    os.environ['STORAGE_BACKEND'] = 'json'
+    os.environ.pop('GATEWAY_TRACE_PATH', None)
+    logging.basicConfig(level=logging.WARNING, format='%(levelname)s %(name)s: %(message)s')
+    trace = Path(args.trace).resolve() if args.trace else None
+    output = Path(args.output).resolve() if args.output else None
+    args.trace = trace
+
+    workdir = prepare_workdir(REPLAY_DATA)
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        report = asyncio.run(run(args))
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print_report(report)
+    if output:
+        output.write_text(json.dumps(report, indent=2) + '\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
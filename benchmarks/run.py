@@ -0,0 +1,184 @@
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+BASELINE_PATH = REPO_ROOT / 'benchmarks' / 'baseline.json'
+# Read-only inputs the cogs load from data/; everything else starts empty
+SHARED_DATA = ('airports.csv', 'runways.csv', 'alert_keywords.json', 'asset_index.json')
+
+# A case regresses when its median per-op time grows by more than this fraction...
+DEFAULT_TOLERANCE = 0.25
+# ...and by more than this many milliseconds, so microsecond jitter isn't flagged
+NOISE_FLOOR_MS = 0.02
+WARMUP = 3
+
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+async def measure(setup, scale, iterations=None):
+    started = time.perf_counter()
+    workload = await setup(scale)
+    setup_seconds = time.perf_counter() - started
+    iterations = iterations or workload.iterations
+
+    samples = []
+    gc.collect()
+    for i in range(WARMUP + iterations):
+        if workload.prepare:
+            workload.prepare(i)
+        started = time.perf_counter()
+        await workload.run(i)
+        elapsed = (time.perf_counter() - started) * 1000 / workload.ops
+        if i >= WARMUP:
+            samples.append(elapsed)
+
+    return {
+        'iterations': iterations,
+        'ops_per_iteration': workload.ops,
+        'dataset': workload.dataset,
+        'setup_seconds': round(setup_seconds, 3),
+        'median_ms': round(statistics.median(samples), 4),
+        'mean_ms': round(statistics.fmean(samples), 4),
+        'p95_ms': round(percentile(samples, 0.95), 4),
+        'min_ms': round(min(samples), 4),
+        'max_ms': round(max(samples), 4)
+    }
+
+
+async def run_cases(names, scale, iterations):
+    from benchmarks.cases import CASES, SHARED
+    from utils import storage
+
+    results = {}
+    for position, name in enumerate(names):
+        tasks_before = asyncio.all_tasks()
+        results[name] = await measure(CASES[name], scale, iterations)
+        print(f"{name:32} {results[name]['median_ms']:>10.4f} ms/op (p95 {results[name]['p95_ms']:.4f}, setup {results[name]['setup_seconds']:.1f}s)")
+        # Drop follow-up work (alert edits, delayed writes) so it can't bleed into the next case
+        for task in asyncio.all_tasks() - tasks_before:
+            task.cancel()
+        await asyncio.sleep(0)
+        following = names[position + 1] if position + 1 < len(names) else None
+        if following is None or following.split('.')[0] != name.split('.')[0]:
+            SHARED.clear()
+            gc.collect()
+    await storage.flush_all()
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Per-case comparison lines and the names of cases that regressed"""
+    lines, regressions = [], []
+    for name, result in results.items():
+        before = baseline['results'].get(name)
+        if before is None:
+            lines.append(f"{name:32} (no baseline)")
+            continue
+        ratio = result['median_ms'] / before['median_ms'] if before['median_ms'] else float('inf')
+        regressed = ratio > 1 + tolerance and result['median_ms'] - before['median_ms'] > NOISE_FLOOR_MS
+        if regressed:
+            regressions.append(name)
+        lines.append(f"{name:32} {before['median_ms']:>10.4f} -> {result['median_ms']:>10.4f} ms/op "
+                     f"({(ratio - 1) * 100:+.0f}%){'  REGRESSION' if regressed else ''}")
+    return lines, regressions
+
+
+def prepare_workdir(names=SHARED_DATA):
+    """Scratch data/ directory, so cog stores never write over the real data files"""
+    workdir = Path(tempfile.mkdtemp(prefix='ems-bench-'))
+    (workdir / 'data').mkdir()
+    for name in names:
+        source = REPO_ROOT / 'data' / name
+        if source.exists():
+            shutil.copy(source, workdir / 'data' / name)
+    return workdir
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the cogs' hot paths against synthetic data")
+    parser.add_argument('cases', nargs='*', help="Cases to run (default: all)")
+    parser.add_argument('--scale', type=float, default=1.0, help="Dataset size multiplier (1.0 = 1M missions, 100k reminders, 50k documents, 10k topics)")
+    parser.add_argument('--iterations', type=int, help="Override each case's iteration count")
+    parser.add_argument('--output', help="Write results JSON here")
+    parser.add_argument('--baseline', default=str(BASELINE_PATH), help="Baseline JSON to compare against")
+    parser.add_argument('--save-baseline', action='store_true', help="Store these results as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE, help="Allowed slowdown before a case counts as a regression")
+    parser.add_argument('--list', action='store_true', help="List cases and exit")
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(REPO_ROOT))
+    # Cogs pick their backend at construction; benchmark the in-memory JSON path
+    os.environ['STORAGE_BACKEND'] = 'json'
+    logging.basicConfig(level=logging.WARNING, format='%(levelname)s %(name)s: %(message)s')
+    from benchmarks.cases import CASES
+
+    if args.list:
+        print('\n'.join(CASES))
+        return 0
+    unknown = [name for name in args.cases if name not in CASES]
+    if unknown:
+        parser.error(f"unknown case(s): {', '.join(unknown)}")
+    names = args.cases or list(CASES)
+
+    baseline_path = Path(args.baseline).resolve()
+    output_path = Path(args.output).resolve() if args.output else None
+    workdir = prepare_workdir()
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        results = asyncio.run(run_cases(names, args.scale, args.iterations))
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'scale': args.scale,
+        'results': results
+    }
+    if output_path:
+        output_path.write_text(json.dumps(report, indent=2) + '\n')
+    if args.save_baseline:
+        if baseline_path.exists():
+            merged = json.loads(baseline_path.read_text())
+            if merged.get('scale') == args.scale:
+                report['results'] = {**merged['results'], **results}
+        baseline_path.write_text(json.dumps(report, indent=2) + '\n')
+        print(f"Saved baseline to {baseline_path}")
+        return 0
+
+    if not baseline_path.exists():
+        print("No baseline to compare against; run with --save-baseline to create one")
+        return 0
+    baseline = json.loads(baseline_path.read_text())
+    if baseline.get('scale') != args.scale:
+        print(f"Baseline was recorded at scale {baseline.get('scale')}, not {args.scale}; skipping comparison")
+        return 0
+    lines, regressions = compare(results, baseline, args.tolerance)
+    print(f"\nCompared with baseline from {baseline['created']} ({baseline['platform']}):")
+    print('\n'.join(lines))
+    if regressions:
+        print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
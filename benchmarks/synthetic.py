@@ -0,0 +1,156 @@
+import random
+from datetime import datetime, timedelta, timezone
+
+# Seeded generators for benchmark datasets. Records carry the same fields
+# the cogs write themselves (start_mission, schedule, upload_doc), so the
+# code under test can't tell them from real data.
+
+# Full-size datasets; --scale multiplies all of them
+MISSIONS = 1_000_000
+REMINDERS = 100_000
+DOCUMENTS = 50_000
+TOPICS = 10_000
+
+PILOTS = 2_000
+CHANNELS = 500
+DAYS_OF_HISTORY = 365
+
+MISSION_TYPES = ['Medical Evacuation', 'Search & Rescue', 'Patient Transfer', 'Training Flight', 'Emergency Response']
+OUTCOMES = ['true', 'true', 'true', 'partial', 'false']
+VISIBILITIES = ['Student', 'Student', 'Trainer', 'Command']
+CATEGORIES = ['General', 'Procedures', 'Checklists', 'Aircraft', 'Medical', 'Navigation', 'Weather', 'Radio']
+REPEATS = ['None', 'None', 'Daily', 'Weekly', 'Monthly']
+
+VOCABULARY = (
+    'engine failure fire smoke cabin pressure hydraulic fuel electrical avionics radio comms '
+    'approach landing takeoff climb descent glide autorotation hover winch hoist stretcher '
+    'patient trauma cardiac airway oxygen bleeding fracture burns spinal triage vitals '
+    'weather icing turbulence visibility fog crosswind night mountain water hospital helipad '
+    'checklist briefing handover crew pilot paramedic doctor dispatcher coordination '
+    'altitude airspeed heading navigation gps transponder squawk mayday pan frequency '
+    'rescue evacuation transfer search perimeter landing zone rotor tail skid'
+).split()
+
+CHATTER = [
+    'anyone up for a training flight tonight',
+    'thanks for the briefing earlier, very helpful',
+    'what frequency are we using for the exercise',
+    'landing zone at the hospital is clear now',
+    'running a bit late, start without me',
+    'great job on the patient transfer today',
+    'does anyone have the new checklist pdf',
+    'weather looks rough over the mountains tomorrow'
+]
+ALERTS = [
+    'MAYDAY MAYDAY engine failure at 3000 feet',
+    'we have an engine fire, requesting emergency landing',
+    'hydraulic failure on approach, declaring emergency',
+    'pan-pan fuel emergency, diverting to nearest airport',
+    'lost comms with dispatch, squawking 7600'
+]
+
+
+def words(rng, count):
+    return ' '.join(rng.choice(VOCABULARY) for _ in range(count))
+
+
+def scaled(size, scale):
+    return max(int(size * scale), 1)
+
+
+def pilots(count=PILOTS):
+    return [(str(100_000_000_000_000_000 + i), f"Pilot {i:04d}") for i in range(count)]
+
+
+def missions(count, seed=1):
+    """{id: mission} with finished missions spread over the last year, oldest first"""
+    rng = random.Random(seed)
+    crew = pilots()
+    now = datetime.now(timezone.utc)
+    start = now - timedelta(days=DAYS_OF_HISTORY)
+    step = (now - start) / count
+    result = {}
+    for i in range(1, count + 1):
+        user_id, user_name = rng.choice(crew)
+        started = start + step * i
+        result[str(i)] = {
+            'id': i,
+            'user_id': user_id,
+            'user_name': user_name,
+            'type': rng.choice(MISSION_TYPES),
+            'location': f"{rng.choice(VOCABULARY).title()} {rng.choice(['Hospital', 'Base', 'Ridge', 'Harbour'])}",
+            'description': words(rng, 6),
+            'start_time': started.isoformat(),
+            'end_time': (started + timedelta(minutes=rng.randint(10, 180))).isoformat(),
+            'success': rng.choice(OUTCOMES),
+            'notes': None
+        }
+    return result
+
+
+def reminders(count, seed=2):
+    """{id: reminder}, all active and due over the next 30 days"""
+    rng = random.Random(seed)
+    crew = pilots()
+    now = datetime.now(timezone.utc)
+    result = {}
+    for i in range(1, count + 1):
+        user_id, user_name = rng.choice(crew)
+        result[str(i)] = {
+            'id': i,
+            'message': words(rng, rng.randint(4, 12)),
+            'channel_id': str(200_000_000_000_000_000 + rng.randrange(CHANNELS)),
+            'created_by': user_id,
+            'created_by_name': user_name,
+            'reminder_time': (now + timedelta(seconds=rng.randint(60, 30 * 86400))).isoformat(),
+            'repeat': rng.choice(REPEATS),
+            'active': True,
+            'created_at': now.isoformat()
+        }
+    return result
+
+
+def documents(count, seed=3):
+    """Document list with unique names"""
+    rng = random.Random(seed)
+    crew = pilots()
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    return [{
+        'id': i,
+        'name': f"{words(rng, 3).title()} {i}",
+        'description': words(rng, 10),
+        'visibility': rng.choice(VISIBILITIES),
+        'category': rng.choice(CATEGORIES),
+        'url': f"https://example.com/docs/{i}.pdf" if rng.random() < 0.5 else None,
+        'uploaded_by': rng.choice(crew)[0],
+        'uploaded_at': (now - timedelta(days=rng.randint(0, DAYS_OF_HISTORY))).isoformat(),
+        'file_path': None
+    } for i in range(1, count + 1)]
+
+
+def knowledge_base(topics, seed=4):
+    """{category: {topic: content}} in the ems_knowledge.json layout"""
+    rng = random.Random(seed)
+    categories = [f"{category.lower()}_procedures" for category in CATEGORIES]
+    result = {category: {} for category in categories}
+    for i in range(topics):
+        topic = f"{rng.choice(VOCABULARY)}_{rng.choice(VOCABULARY)}_{i}"
+        result[rng.choice(categories)][topic] = {
+            'description': words(rng, 12),
+            'keywords': [rng.choice(VOCABULARY) for _ in range(6)],
+            'procedures': [words(rng, 8) for _ in range(5)],
+            'tips': [words(rng, 8) for _ in range(3)]
+        }
+    return result
+
+
+def queries(count, seed=5):
+    rng = random.Random(seed)
+    return [words(rng, rng.randint(1, 4)) for _ in range(count)]
+
+
+def messages(count, alert_ratio=0.05, seed=6):
+    """Chat lines with the occasional emergency report mixed in"""
+    rng = random.Random(seed)
+    return [rng.choice(ALERTS) if rng.random() < alert_ratio else f"{rng.choice(CHATTER)} {words(rng, rng.randint(0, 8))}"
+            for _ in range(count)]
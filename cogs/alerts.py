@@ -5,42 +5,85 @@ import re
 import asyncio
 import logging
 import aiohttp
+import time
 from datetime import datetime
+from pathlib import Path
+from utils.cache import TTLCache
+from utils.embeds import EmbedCache
+from utils.geo import AirportIndex
+from utils.keywords import KeywordMatcher
+from utils.metrics import metrics
+from utils.startup import profile
 
 logger = logging.getLogger(__name__)
 
+# A channel's incident stays open this long after its last report; reports
+# in that window update the existing alert instead of posting a new one
+ALERT_COOLDOWN_SECONDS = 10 * 60
+# Minimum gap between edits of one alert message
+ALERT_EDIT_INTERVAL = 5
+
+# Used when data/alert_keywords.json is missing or unreadable
+DEFAULT_EMERGENCY_KEYWORDS = [
+    'mayday', 'engine failure', 'crash', 'emergency landing',
+    'fuel emergency', 'instrument failure',
+    'medical emergency', 'pan-pan', 'emergency descent',
+    'lost comms', 'hydraulic failure', 'fire', 'emergency'
+]
+
 class AlertsCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.emergency_keywords = [
-            'mayday', 'engine failure', 'crash', 'emergency landing',
-            'fuel emergency', 'engine failure', 'instrument failure',
-            'medical emergency', 'pan-pan', 'emergency descent',
-            'lost comms', 'hydraulic failure', 'fire', 'emergency'
-        ]
+        self.emergency_keywords = DEFAULT_EMERGENCY_KEYWORDS
+        self.keyword_matcher = KeywordMatcher(self.emergency_keywords)
+        # channel_id -> open incident
+        self.incidents = TTLCache(maxsize=1024, ttl=ALERT_COOLDOWN_SECONDS)
+        # (channel_id, user_id, keyword) seen recently; repeats are ignored outright
+        self.recent_triggers = TTLCache(maxsize=8192, ttl=ALERT_COOLDOWN_SECONDS)
+        # Filled in cog_load
+        self.airport_index = AirportIndex()
+        self.embeds = EmbedCache()
+        self.embeds.register('emergency_info', self.build_emergency_info_embed)
+        self.embeds.warm()
+        
+    def load_data(self):
+        self.load_keywords()
+        self.airport_index = AirportIndex.load()
+        logger.info(f"Loaded {len(self.airport_index.airports)} airports")
+    
+    async def cog_load(self):
+        """Read keywords and the airport dataset off the event loop"""
+        with profile.timed(__name__, 'data load'):
+            await asyncio.to_thread(self.load_data)
+        
+    def load_keywords(self):
+        """Load alert keywords from config and compile them into one matcher"""
+        try:
+            keywords_file = Path('data/alert_keywords.json')
+            if keywords_file.exists():
+                with open(keywords_file, 'r', encoding='utf-8') as f:
+                    keywords = json.load(f).get('emergency_keywords', [])
+                if keywords:
+                    # Build first, then swap, so a bad file never leaves us without a matcher
+                    matcher = KeywordMatcher(keywords)
+                    self.emergency_keywords = matcher.keywords
+                    self.keyword_matcher = matcher
+            logger.info(f"Loaded {len(self.emergency_keywords)} alert keywords")
+        except Exception as e:
+            logger.error(f"Error loading alert keywords: {e}")
         
     async def get_nearest_airports(self, lat, lon, limit=3):
         """Get nearest airports to given coordinates"""
         try:
-            # Mock airport data - in production, use a real airport database API
-            airports = [
-                {
-                    'name': 'Primary Regional Airport',
-                    'distance': '12.3 NM',
-                    'runways': '09/27 (8000ft), 15/33 (6500ft)'
-                },
-                {
-                    'name': 'Secondary Municipal',  
-                    'distance': '18.7 NM',
-                    'runways': '12/30 (5000ft)'
-                },
-                {
-                    'name': 'Emergency Strip',
-                    'distance': '25.1 NM', 
-                    'runways': '05/23 (3500ft)'
-                }
-            ]
-            return airports[:limit]
+            airports = []
+            for airport, distance in self.airport_index.nearest(lat, lon, limit):
+                runways = ", ".join(f"{name} ({length}ft)" for name, length in airport['runways'][:3])
+                airports.append({
+                    'name': f"{airport['ident']} - {airport['name']}",
+                    'distance': f"{distance:.1f} NM",
+                    'runways': runways or "Unknown"
+                })
+            return airports
         except Exception as e:
             logger.error(f"Error fetching airports: {e}")
             return []
@@ -141,42 +184,111 @@ class AlertsCog(commands.Cog):
         if message.author.bot:
             return
         
-        content = message.content.lower()
-        
-        # Check for emergency keywords
-        detected_emergency = None
-        for keyword in self.emergency_keywords:
-            if keyword in content:
-                detected_emergency = keyword
-                break
-                
-        if detected_emergency:
-            try:
-                # Create alert embed
-                embed = await self.create_alert_embed(message, detected_emergency)
-                
-                # Send alert to current channel
-                alert_channel = message.channel
-                
-                # Send alert
-                alert_message = await alert_channel.send(
-                    content="@everyone 🚨 **EMERGENCY RESPONSE ALERT** 🚨",
-                    embed=embed
-                )
-                
-                # Add reaction to original message
-                await message.add_reaction("🚨")
-                
-                # Pin the alert message if possible
-                try:
-                    await alert_message.pin()
-                except:
-                    pass  # Ignore if can't pin
+        with metrics.timed('event', 'alerts.on_message', len(message.content.encode('utf-8'))) as timer:
+            # Check for emergency keywords
+            matched_keywords = self.keyword_matcher.find_all(message.content)
+            detected_emergency = matched_keywords[0] if matched_keywords else None
                     
-                logger.info(f"Emergency alert triggered by {message.author} for keyword: {detected_emergency} in channel: {message.channel.id}")
-                
-            except Exception as e:
-                logger.error(f"Error creating emergency alert: {e}")
+            if detected_emergency:
+                try:
+                    await self.raise_alert(message, matched_keywords)
+                except Exception as e:
+                    timer.error = True
+                    logger.error(f"Error creating emergency alert: {e}")
+
+    async def raise_alert(self, message, matched_keywords):
+        """Open an incident for the channel, or fold this report into the open one"""
+        channel_id = message.channel.id
+        fresh_keywords = [k for k in matched_keywords
+                          if self.recent_triggers.get((channel_id, message.author.id, k)) is None]
+        if not fresh_keywords:
+            return
+        for keyword in fresh_keywords:
+            self.recent_triggers.set((channel_id, message.author.id, keyword), True)
+        
+        incident = self.incidents.get(channel_id)
+        if incident is not None:
+            incident['reports'] += 1
+            incident['reporters'].add(message.author.id)
+            incident['keywords'].update(dict.fromkeys(fresh_keywords))
+            incident['latest'] = message.content
+            # Each report keeps the incident open for another cooldown window
+            self.incidents.set(channel_id, incident)
+            self.schedule_incident_edit(incident)
+            logger.info(f"Emergency report from {message.author} folded into open incident in channel: {channel_id}")
+            return
+        
+        # Register before awaiting so concurrent reports join this incident
+        incident = {
+            'message': None,
+            'embed': None,
+            'keywords': dict.fromkeys(fresh_keywords),
+            'reporters': {message.author.id},
+            'reports': 1,
+            'latest': message.content,
+            'last_edit': 0,
+            'edit_task': None
+        }
+        self.incidents.set(channel_id, incident)
+        
+        try:
+            # Create alert embed
+            incident['embed'] = await self.create_alert_embed(message, fresh_keywords[0])
+            
+            # Send alert to current channel
+            incident['message'] = await message.channel.send(
+                content="@everyone 🚨 **EMERGENCY RESPONSE ALERT** 🚨",
+                embed=incident['embed']
+            )
+            incident['last_edit'] = time.monotonic()
+        except Exception:
+            self.incidents.pop(channel_id)
+            # Nothing was announced, so let this report and any folded into it trigger again
+            for reporter in incident['reporters']:
+                for keyword in incident['keywords']:
+                    self.recent_triggers.pop((channel_id, reporter, keyword))
+            raise
+        
+        # Add reaction to original message
+        await message.add_reaction("🚨")
+        
+        # Pin the alert message if possible
+        try:
+            await incident['message'].pin()
+        except:
+            pass  # Ignore if can't pin
+        
+        # Reports that arrived while the alert was being sent
+        if incident['reports'] > 1:
+            self.schedule_incident_edit(incident)
+            
+        logger.info(f"Emergency alert triggered by {message.author} for keywords: {', '.join(fresh_keywords)} in channel: {channel_id}")
+
+    def schedule_incident_edit(self, incident):
+        """Queue one edit of the incident's alert, at most every ALERT_EDIT_INTERVAL seconds"""
+        if incident['message'] is None:
+            return
+        if incident['edit_task'] is not None and not incident['edit_task'].done():
+            return
+        delay = max(incident['last_edit'] + ALERT_EDIT_INTERVAL - time.monotonic(), 0)
+        incident['edit_task'] = asyncio.create_task(self.edit_incident(incident, delay))
+
+    async def edit_incident(self, incident, delay):
+        """Update the alert message with everything reported so far"""
+        await asyncio.sleep(delay)
+        embed = incident['embed'].copy()
+        embed.add_field(
+            name="📈 Incident Updates",
+            value=f"**Reports:** {incident['reports']} from {len(incident['reporters'])} user(s)\n"
+                  f"**Keywords:** {', '.join(incident['keywords'])[:300]}\n"
+                  f"**Latest:** ```{incident['latest'][:400]}```",
+            inline=False
+        )
+        try:
+            await incident['message'].edit(embed=embed)
+        except discord.HTTPException as e:
+            logger.warning(f"Could not update alert message: {e}")
+        incident['last_edit'] = time.monotonic()
 
     @commands.command(name="test_alert")
     @commands.has_permissions(administrator=True)
@@ -191,9 +303,15 @@ class AlertsCog(commands.Cog):
         except Exception as e:
             await ctx.send(f"❌ Error creating test alert: {e}")
 
-    @discord.app_commands.command(name="emergency_info", description="Get information about emergency procedures")
-    async def emergency_info(self, interaction: discord.Interaction):
-        """Provide emergency procedure information"""
+    @commands.command(name="reload_alert_keywords")
+    @commands.has_permissions(administrator=True)
+    async def reload_alert_keywords(self, ctx):
+        """Reload emergency keywords from data/alert_keywords.json (Admin only)"""
+        self.load_keywords()
+        await ctx.send(f"✅ Loaded {len(self.emergency_keywords)} alert keywords: {', '.join(self.emergency_keywords)}")
+
+    def build_emergency_info_embed(self):
+        """Static emergency procedures summary"""
         embed = discord.Embed(
             title="🚨 Emergency Procedures",
             description="Essential emergency response information for EMS flights",
@@ -226,8 +344,12 @@ class AlertsCog(commands.Cog):
                   "• Maintain communication with ATC",
             inline=False
         )
-        
-        await interaction.response.send_message(embed=embed)
+        return embed
+
+    @discord.app_commands.command(name="emergency_info", description="Get information about emergency procedures")
+    async def emergency_info(self, interaction: discord.Interaction):
+        """Provide emergency procedure information"""
+        await interaction.response.send_message(embed=self.embeds.get('emergency_info'))
 
     @discord.app_commands.command(name="report_emergency", description="Report emergency from external EMS server")
     @discord.app_commands.describe(
@@ -304,4 +426,6 @@ class AlertsCog(commands.Cog):
             await interaction.response.send_message("❌ Error creating emergency report.")
 
 async def setup(bot):
-    await bot.add_cog(AlertsCog(bot))
+    with profile.timed(__name__, 'construct'):
+        cog = AlertsCog(bot)
+    await bot.add_cog(cog)
@@ -1,45 +1,127 @@
+import asyncio
+import io
 import discord
 from discord.ext import commands
-import json
 import logging
-from pathlib import Path
 from datetime import datetime
+from itertools import islice
+from utils.assets import format_hits, get_asset_index
+from utils.database import get_database
+from utils.documents import (FORMATS, NEXT_ID_KEY, DocumentCatalog, ManifestError, assign_ids, document_problems, export_lines,
+                             manifest_format, pack_documents, read_manifest, unpack_documents, validate_manifest)
+from utils.pagination import Paginator
+from utils.startup import profile
+from utils.storage import JSONStore
+from utils.trie import PrefixTrie
 
 logger = logging.getLogger(__name__)
 
+# Manifests are read into memory and validated on the event loop; this keeps that well under a tick
+MAX_MANIFEST_BYTES = 1024 * 1024
+# Problems listed in the reply to a rejected import
+MAX_REPORTED_PROBLEMS = 10
+DOCS_PAGE_SIZE = 10
+
 class DocumentsCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.documents = []
+        self.documents = {}  # id -> document, in id order
+        self.by_name = {}    # lowercased name -> document
+        self.next_id = 1
         self.rank_hierarchy = {
             "Student": 1,
             "Trainer": 2, 
             "Command": 3
         }
-        self.load_documents()
+        self.db = get_database()
+        self.store = JSONStore('data/documents.json', default=lambda: pack_documents([], 1))
+        self.name_trie = PrefixTrie()
+        self.catalog = DocumentCatalog(self.rank_hierarchy)
+    
+    async def cog_load(self):
+        """Read documents off the event loop"""
+        with profile.timed(__name__, 'data load'):
+            await asyncio.to_thread(self.load_documents)
+            # The training material index is shared with /ask_ems; warm it here too
+            await asyncio.to_thread(get_asset_index)
         
     def load_documents(self):
         """Load documents database"""
         try:
-            docs_file = Path('data/documents.json')
-            if docs_file.exists():
-                with open(docs_file, 'r', encoding='utf-8') as f:
-                    self.documents = json.load(f)
+            if self.db:
+                documents, next_id = unpack_documents({'next_id': self.db.get_meta(NEXT_ID_KEY, 1),
+                                                       'documents': self.db.records('documents', "ORDER BY id")})
             else:
-                self.documents = []
-                self.save_documents()
+                documents, next_id = unpack_documents(self.store.load())
         except Exception as e:
             logger.error(f"Error loading documents: {e}")
-            self.documents = []
+            documents, next_id = [], 1
+        self.documents = {}
+        self.by_name = {}
+        self.next_id = next_id
+        self.name_trie = PrefixTrie()
+        self.catalog = DocumentCatalog(self.rank_hierarchy)
+        for doc in documents:
+            self.index_document(doc)
+    
+    def snapshot(self):
+        return pack_documents(list(self.documents.values()), self.next_id)
+    
+    def allocate_id(self):
+        """Next document id; ids only ever go up, so a removed document's id is never reused"""
+        doc_id = self.next_id
+        self.next_id += 1
+        return doc_id
+    
+    def find_document(self, key):
+        """Document by id or (case-insensitive) name"""
+        doc = self.documents.get(int(key)) if key.isdecimal() else None
+        return doc or self.by_name.get(key.lower())
     
-    async def save_documents(self):
-        """Save documents database"""
+    @staticmethod
+    def trie_entry(doc):
+        # Carries what autocomplete needs, so suggestions never look the document up
+        return (doc['id'], doc['name'], doc.get('visibility', 'Student'))
+    
+    def index_document(self, doc):
+        self.documents[doc['id']] = doc
+        self.by_name[doc['name'].lower()] = doc
+        self.name_trie.insert(doc['name'], self.trie_entry(doc))
+        self.catalog.add(doc)
+    
+    def unindex_document(self, doc):
+        del self.documents[doc['id']]
+        del self.by_name[doc['name'].lower()]
+        self.name_trie.remove(self.trie_entry(doc))
+        self.catalog.remove(doc)
+    
+    async def save_documents(self, changed=(), removed=()):
+        """Persist changed/removed documents (SQLite) or queue the documents database for writing"""
+        if self.db:
+            await self.db.save('documents', changed, [doc['id'] for doc in removed])
+            if changed:
+                await self.db.save_meta(NEXT_ID_KEY, self.next_id)
+            return
+        self.store.save(self.snapshot)
+    
+    async def add_documents(self, documents):
+        """Add documents in a single write; if it fails, none of them are kept"""
+        for doc in documents:
+            self.index_document(doc)
         try:
-            Path('data').mkdir(exist_ok=True)
-            with open('data/documents.json', 'w', encoding='utf-8') as f:
-                json.dump(self.documents, f, indent=2)
-        except Exception as e:
-            logger.error(f"Error saving documents: {e}")
+            if self.db:
+                await self.db.commit('documents', documents)
+                await self.db.save_meta(NEXT_ID_KEY, self.next_id)
+            else:
+                self.store.save(self.snapshot)
+                if not await self.store.flush():
+                    raise OSError(f"could not write {self.store.path}")
+        except Exception:
+            for doc in documents:
+                self.unindex_document(doc)
+            if not self.db:
+                self.store.save(self.snapshot)
+            raise
     
     def get_user_rank(self, user):
         """Get user's rank from roles"""
@@ -59,69 +141,106 @@ class DocumentsCog(commands.Cog):
         doc_level = self.rank_hierarchy.get(doc_visibility, 1)
         return user_level >= doc_level
 
+    def build_docs_embed(self, user_rank, search, docs, page_hits, page, page_count, total):
+        if not docs and not page_hits:
+            embed = discord.Embed(
+                title="📁 No Documents Found",
+                description="No documents available for your access level" + (f" matching '{search}'" if search else ""),
+                color=0xffa500
+            )
+        else:
+            embed = discord.Embed(
+                title="📚 Training Documents",
+                description=f"{total} document(s) available for **{user_rank}** rank" + (f" | Search: '{search}'" if search else ""),
+                color=0x3498db
+            )
+            
+            # Group by category
+            categories = {}
+            for doc in docs:
+                categories.setdefault(doc.get('category', 'General'), []).append(doc)
+            
+            for category, category_docs in categories.items():
+                doc_list = ""
+                for doc in category_docs:
+                    doc_list += f"**{doc['name']}** ({doc.get('visibility', 'Student')})\n"
+                    doc_list += f"└ {doc.get('description', 'No description')}\n"
+                    if doc.get('url'):
+                        doc_list += f"└ [View Document]({doc['url']})\n"
+                    doc_list += "\n"
+                
+                embed.add_field(
+                    name=f"📖 {category}",
+                    value=doc_list[:1000] + ("..." if len(doc_list) > 1000 else ""),
+                    inline=False
+                )
+            
+            if page_hits:
+                embed.add_field(
+                    name="📄 Matching Pages",
+                    value=format_hits(page_hits),
+                    inline=False
+                )
+        
+        embed.add_field(
+            name="ℹ️ Your Access Level",
+            value=f"**{user_rank}** - You can access {user_rank} and lower level documents",
+            inline=False
+        )
+        
+        footer = "Use /upload_doc to add new documents (Trainer+ only)"
+        embed.set_footer(text=f"Page {page + 1}/{page_count} • {footer}" if page_count > 1 else footer)
+        return embed
+
     @discord.app_commands.command(name="docs", description="Display available training documents")
     @discord.app_commands.describe(search="Search for specific documents")
     async def docs(self, interaction: discord.Interaction, search: str = None):
         """Display available documents based on user rank"""
         try:
             user_rank = self.get_user_rank(interaction.user)
+            level = self.rank_hierarchy.get(user_rank, 1)
             
-            # Filter documents by access level
-            accessible_docs = []
-            for doc in self.documents:
-                if self.can_access_document(user_rank, doc.get('visibility', 'Student')):
-                    if search is None or search.lower() in doc['name'].lower() or search.lower() in doc.get('description', '').lower():
-                        accessible_docs.append(doc)
-            
-            if not accessible_docs:
-                embed = discord.Embed(
-                    title="📁 No Documents Found",
-                    description="No documents available for your access level" + (f" matching '{search}'" if search else ""),
-                    color=0xffa500
-                )
-            else:
-                embed = discord.Embed(
-                    title="📚 Training Documents",
-                    description=f"Available documents for **{user_rank}** rank" + (f" | Search: '{search}'" if search else ""),
-                    color=0x3498db
-                )
+            # Only partitions at or below the user's level are ever read
+            page_hits = []
+            if search:
+                matches = self.catalog.search(search, level)
+                total = len(matches)
                 
-                # Group by category
-                categories = {}
-                for doc in accessible_docs[:10]:  # Limit to 10 docs
-                    category = doc.get('category', 'General')
-                    if category not in categories:
-                        categories[category] = []
-                    categories[category].append(doc)
+                def get_page(page):
+                    return matches[page * DOCS_PAGE_SIZE:(page + 1) * DOCS_PAGE_SIZE]
                 
-                for category, docs in categories.items():
-                    doc_list = ""
-                    for doc in docs:
-                        doc_list += f"**{doc['name']}** ({doc.get('visibility', 'Student')})\n"
-                        doc_list += f"└ {doc.get('description', 'No description')}\n"
-                        if doc.get('url'):
-                            doc_list += f"└ [View Document]({doc['url']})\n"
-                        doc_list += "\n"
-                    
-                    embed.add_field(
-                        name=f"📖 {category}",
-                        value=doc_list[:1000] + ("..." if len(doc_list) > 1000 else ""),
-                        inline=False
-                    )
-            
-            embed.add_field(
-                name="ℹ️ Your Access Level",
-                value=f"**{user_rank}** - You can access {user_rank} and lower level documents",
-                inline=False
-            )
+                page_hits = get_asset_index().search(search, 3, allowed=lambda visibility: self.can_access_document(user_rank, visibility))
+            else:
+                total = self.catalog.count(level)
+                
+                def get_page(page):
+                    return list(islice(self.catalog.listing(level), page * DOCS_PAGE_SIZE, (page + 1) * DOCS_PAGE_SIZE))
             
-            embed.set_footer(text="Use /upload_doc to add new documents (Trainer+ only)")
-            await interaction.response.send_message(embed=embed)
+            page_count = max(1, (total + DOCS_PAGE_SIZE - 1) // DOCS_PAGE_SIZE)
+            
+            async def render(page):
+                # Training-material hits belong to the query, not a page; show them once
+                return self.build_docs_embed(user_rank, search, get_page(page), page_hits if page == 0 else [], page, page_count, total)
+            
+            embed = await render(0)
+            if page_count == 1:
+                await interaction.response.send_message(embed=embed)
+                return
+            
+            view = Paginator(render, page_count, interaction.user.id)
+            await interaction.response.send_message(embed=embed, view=view)
+            view.message = await interaction.original_response()
             
         except Exception as e:
             logger.error(f"Error in docs command: {e}")
             await interaction.response.send_message("❌ An error occurred while loading documents.")
 
+    @docs.autocomplete('search')
+    async def docs_autocomplete(self, interaction: discord.Interaction, current: str):
+        user_rank = self.get_user_rank(interaction.user)
+        entries = self.name_trie.complete(current, 25, accept=lambda entry: self.can_access_document(user_rank, entry[2]))
+        return [discord.app_commands.Choice(name=name[:100], value=name[:100]) for _, name, _ in entries]
+
     @discord.app_commands.command(name="upload_doc", description="Upload a new training document (Trainer+ only)")
     @discord.app_commands.describe(
         name="Document name",
@@ -153,15 +272,21 @@ class DocumentsCog(commands.Cog):
                 await interaction.response.send_message("❌ You need Trainer rank or higher to upload documents.")
                 return
             
+            # Same rules as /import_docs, so uploaded and imported documents look alike
+            name, description, url = name.strip(), description.strip(), (url or '').strip() or None
+            problems = document_problems(name, description, visibility, url)
+            if problems:
+                await interaction.response.send_message(f"❌ Can't upload this document: {'; '.join(problems)}.")
+                return
+            
             # Check if document name already exists
-            existing_doc = next((doc for doc in self.documents if doc['name'].lower() == name.lower()), None)
-            if existing_doc:
+            if name.lower() in self.by_name:
                 await interaction.response.send_message(f"❌ A document named '{name}' already exists.")
                 return
             
             # Create document entry
             document = {
-                'id': len(self.documents) + 1,
+                'id': self.allocate_id(),
                 'name': name,
                 'description': description,
                 'visibility': visibility,
@@ -172,8 +297,8 @@ class DocumentsCog(commands.Cog):
                 'file_path': None
             }
             
-            self.documents.append(document)
-            await self.save_documents()
+            self.index_document(document)
+            await self.save_documents(changed=[document])
             
             embed = discord.Embed(
                 title="✅ Document Uploaded",
@@ -192,6 +317,83 @@ class DocumentsCog(commands.Cog):
             logger.error(f"Error in upload_doc command: {e}")
             await interaction.response.send_message("❌ An error occurred while uploading the document.")
 
+    @discord.app_commands.command(name="import_docs", description="Add documents in bulk from a CSV or JSON-lines manifest (Trainer+ only)")
+    @discord.app_commands.describe(
+        manifest="CSV with a header row, or JSON lines: name, description, visibility, category, url",
+        skip_existing="Skip documents whose name already exists instead of rejecting the manifest"
+    )
+    async def import_docs(self, interaction: discord.Interaction, manifest: discord.Attachment, skip_existing: bool = False):
+        """Validate a whole manifest, then add every document in one write"""
+        try:
+            user_rank = self.get_user_rank(interaction.user)
+            if self.rank_hierarchy.get(user_rank, 0) < 2:
+                await interaction.response.send_message("❌ You need Trainer rank or higher to import documents.")
+                return
+            if manifest.size > MAX_MANIFEST_BYTES:
+                await interaction.response.send_message(f"❌ Manifests are limited to {MAX_MANIFEST_BYTES // 1024} KB.")
+                return
+            
+            await interaction.response.defer()
+            try:
+                text = (await manifest.read()).decode('utf-8-sig')
+                rows = read_manifest(text, manifest_format(manifest.filename))
+                documents, skipped = validate_manifest(rows, self.by_name, skip_existing, uploaded_by=str(interaction.user.id))
+            except UnicodeDecodeError:
+                await interaction.followup.send("❌ The manifest must be UTF-8 text.")
+                return
+            except ManifestError as e:
+                problems = '\n'.join(e.problems[:MAX_REPORTED_PROBLEMS])
+                more = f"\n…and {len(e.problems) - MAX_REPORTED_PROBLEMS} more" if len(e.problems) > MAX_REPORTED_PROBLEMS else ""
+                await interaction.followup.send(f"❌ Nothing was imported. Fix these and try again:\n```\n{problems[:1700]}\n```{more}")
+                return
+            
+            if documents:
+                # No await between validating names and adding, so nothing can claim a name in between
+                self.next_id = assign_ids(documents, self.next_id)
+                await self.add_documents(documents)
+            
+            embed = discord.Embed(
+                title="✅ Documents Imported",
+                description=f"Imported **{len(documents)}** document(s) from `{manifest.filename}`",
+                color=0x00ff00
+            )
+            categories = {}
+            for doc in documents:
+                categories[doc['category']] = categories.get(doc['category'], 0) + 1
+            if categories:
+                embed.add_field(name="Categories", value="\n".join(f"{category}: {count}" for category, count in sorted(categories.items()))[:1024], inline=False)
+            if skipped:
+                embed.add_field(name=f"Skipped {len(skipped)} existing", value=", ".join(skipped)[:1024], inline=False)
+            await interaction.followup.send(embed=embed)
+            
+        except Exception as e:
+            logger.error(f"Error in import_docs command: {e}")
+            message = "❌ An error occurred while importing documents. Nothing was imported."
+            if interaction.response.is_done():
+                await interaction.followup.send(message)
+            else:
+                await interaction.response.send_message(message)
+
+    @discord.app_commands.command(name="export_docs", description="Download the documents you can access as CSV or JSON lines")
+    @discord.app_commands.describe(format="File format")
+    @discord.app_commands.choices(format=[discord.app_commands.Choice(name=fmt, value=fmt) for fmt in FORMATS])
+    async def export_docs(self, interaction: discord.Interaction, format: str = 'csv'):
+        """Export accessible documents; the file re-imports with /import_docs"""
+        try:
+            user_rank = self.get_user_rank(interaction.user)
+            documents = [doc for doc in self.documents.values() if self.can_access_document(user_rank, doc.get('visibility', 'Student'))]
+            payload = await asyncio.to_thread(lambda: ''.join(export_lines(documents, format)).encode('utf-8'))
+            filename = f"documents-{datetime.utcnow():%Y%m%d}.{format}"
+            await interaction.response.send_message(
+                f"📦 {len(documents)} document(s) visible to **{user_rank}**",
+                file=discord.File(io.BytesIO(payload), filename=filename),
+                ephemeral=True
+            )
+            
+        except Exception as e:
+            logger.error(f"Error in export_docs command: {e}")
+            await interaction.response.send_message("❌ An error occurred while exporting documents.", ephemeral=True)
+
     @commands.command(name="remove_doc")
     async def remove_doc(self, ctx, doc_id: str):
         """Remove a training document"""
@@ -203,20 +405,13 @@ class DocumentsCog(commands.Cog):
                 await ctx.send("❌ You need Trainer rank or higher to remove documents.")
                 return
             
-            # Find document
-            doc_to_remove = None
-            for i, doc in enumerate(self.documents):
-                if str(doc['id']) == doc_id or doc['name'].lower() == doc_id.lower():
-                    doc_to_remove = (i, doc)
-                    break
-            
-            if not doc_to_remove:
+            doc = self.find_document(doc_id)
+            if not doc:
                 await ctx.send(f"❌ Document '{doc_id}' not found.")
                 return
             
-            index, doc = doc_to_remove
-            self.documents.pop(index)
-            await self.save_documents()
+            self.unindex_document(doc)
+            await self.save_documents(removed=[doc])
             
             await ctx.send(f"✅ Removed document: **{doc['name']}**")
             
@@ -233,11 +428,12 @@ class DocumentsCog(commands.Cog):
                 return
             
             categories = {}
-            for doc in self.documents:
-                category = doc.get('category', 'General')
-                if category not in categories:
-                    categories[category] = 0
-                categories[category] += 1
+            if self.db:
+                rows = await self.db.fetch("SELECT category, COUNT(*) AS count FROM documents GROUP BY category")
+                for row in rows:
+                    categories[row['category'] or 'General'] = row['count']
+            else:
+                categories = self.catalog.category_counts()
             
             embed = discord.Embed(
                 title="📂 Document Categories",
@@ -258,5 +454,26 @@ class DocumentsCog(commands.Cog):
             logger.error(f"Error in doc_categories command: {e}")
             await ctx.send("❌ An error occurred while loading categories.")
 
+    @commands.command(name="reindex_assets")
+    @commands.has_permissions(administrator=True)
+    async def reindex_assets(self, ctx):
+        """Extract and index new or changed PDFs in attached_assets (Admin only)"""
+        index = get_asset_index()
+        async with ctx.typing():
+            try:
+                stats = await asyncio.to_thread(index.ingest)
+                await asyncio.to_thread(index.save)
+            except Exception as e:
+                logger.error(f"Error re-indexing assets: {e}")
+                await ctx.send("❌ An error occurred while indexing training material.")
+                return
+        await ctx.send(
+            f"✅ Indexed {len(index.contents)} files ({len(index)} chunks): "
+            f"{stats['extracted']} extracted, {stats['unchanged']} unchanged, "
+            f"{stats['removed']} removed, {stats['failed']} failed"
+        )
+
 async def setup(bot):
-    await bot.add_cog(DocumentsCog(bot))
\ No newline at end of file
+    with profile.timed(__name__, 'construct'):
+        cog = DocumentsCog(bot)
+    await bot.add_cog(cog)
\ No newline at end of file
@@ -1,78 +1,127 @@
+import asyncio
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 import json
 import logging
 from pathlib import Path
-import re
+from utils.assets import format_hits, get_asset_index
+from utils.embeds import EmbedCache
+from utils.search import BM25Index
+from utils.startup import profile
+from utils.trie import PrefixTrie
 
 logger = logging.getLogger(__name__)
 
+# Term frequency multiplier per field when ranking knowledge topics
+KNOWLEDGE_FIELD_WEIGHTS = {'keywords': 5, 'topic': 4, 'description': 2, 'procedures': 1, 'tips': 1}
+
+KNOWLEDGE_FILE = Path('data/ems_knowledge.json')
+# How often the knowledge base file is checked for edits
+KNOWLEDGE_POLL_SECONDS = 5
+
 class HelpSystemCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.knowledge_base = {}
-        self.load_knowledge_base()
+        self.search_index = BM25Index(KNOWLEDGE_FIELD_WEIGHTS)
+        self.topic_trie = PrefixTrie()
+        # (mtime_ns, size) of the file the current knowledge base came from
+        self.knowledge_signature = None
+        self.embeds = EmbedCache()
+        self.embeds.register('ems_topics', self.build_ems_topics_embed)
+        self.embeds.register('emergency_guide', self.build_emergency_guide_embed)
         
+    async def cog_load(self):
+        """Read and index the knowledge base off the event loop, then start watching it"""
+        with profile.timed(__name__, 'data load'):
+            await asyncio.to_thread(self.load_knowledge_base)
+        self.embeds.warm()
+        self.knowledge_watcher.start()
+    
+    @staticmethod
+    def knowledge_file_signature():
+        try:
+            stat = KNOWLEDGE_FILE.stat()
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    @staticmethod
+    def read_knowledge_base():
+        """Parse and index the knowledge base file; touches no cog state, so it can run in a thread"""
+        signature = HelpSystemCog.knowledge_file_signature()
+        with open(KNOWLEDGE_FILE, 'r', encoding='utf-8') as f:
+            knowledge_base = json.load(f)
+        index, topic_trie = HelpSystemCog.build_search_index(knowledge_base)
+        return knowledge_base, index, topic_trie, signature
+
+    def apply_knowledge_base(self, knowledge_base, index, topic_trie, signature):
+        """Swap in a freshly built knowledge base; runs on the event loop, so handlers never see a mix"""
+        self.knowledge_base = knowledge_base
+        self.search_index = index
+        self.topic_trie = topic_trie
+        self.knowledge_signature = signature
+        self.embeds.invalidate('ems_topics')
+        logger.info(f"Loaded {len(knowledge_base)} knowledge entries, {len(index)} topics ({len(index.postings)} terms)")
+
     def load_knowledge_base(self):
         """Load EMS knowledge base from JSON file"""
         try:
-            knowledge_file = Path('data/ems_knowledge.json')
-            if knowledge_file.exists():
-                with open(knowledge_file, 'r', encoding='utf-8') as f:
-                    self.knowledge_base = json.load(f)
-                logger.info(f"Loaded {len(self.knowledge_base)} knowledge entries")
+            if KNOWLEDGE_FILE.exists():
+                self.apply_knowledge_base(*self.read_knowledge_base())
             else:
                 logger.warning("Knowledge base file not found")
         except Exception as e:
             logger.error(f"Error loading knowledge base: {e}")
+            # Don't retry the same broken file on every poll
+            self.knowledge_signature = self.knowledge_file_signature()
+
+    @tasks.loop(seconds=KNOWLEDGE_POLL_SECONDS)
+    async def knowledge_watcher(self):
+        """Reload the knowledge base when the file changes on disk"""
+        signature = self.knowledge_file_signature()
+        if signature is None or signature == self.knowledge_signature:
+            return
+        try:
+            loaded = await asyncio.to_thread(self.read_knowledge_base)
+        except Exception as e:
+            # Keep serving the previous version until the file is fixed
+            logger.error(f"Error reloading knowledge base, keeping the previous version: {e}")
+            self.knowledge_signature = signature
+            return
+        self.apply_knowledge_base(*loaded)
+
+    def cog_unload(self):
+        self.knowledge_watcher.cancel()
+
+    @staticmethod
+    def build_search_index(knowledge_base):
+        """Index every topic once so queries only walk the postings of their own terms"""
+        index = BM25Index(KNOWLEDGE_FIELD_WEIGHTS)
+        topic_trie = PrefixTrie()
+        for category, topics in knowledge_base.items():
+            for topic, content in topics.items():
+                topic_trie.insert(topic.replace('_', ' '), (category, topic))
+                index.add((category, topic), {
+                    'keywords': content.get('keywords', []),
+                    'topic': topic,
+                    'description': content.get('description', ''),
+                    'procedures': content.get('procedures', []),
+                    'tips': content.get('tips', [])
+                })
+        return index, topic_trie
 
-    def search_knowledge(self, query):
+    def search_knowledge(self, query, limit=3):
         """Search the knowledge base for relevant information"""
-        query_lower = query.lower()
         results = []
-        query_words = query_lower.split()
-        
-        for category, topics in self.knowledge_base.items():
-            for topic, content in topics.items():
-                score = 0
-                
-                # Check exact keyword matches (high score)
-                keywords = content.get('keywords', [])
-                for keyword in keywords:
-                    if keyword.lower() in query_lower:
-                        score += 10
-                    for word in query_words:
-                        if word in keyword.lower():
-                            score += 5
-                
-                # Check topic name matches
-                if any(word in topic.lower() for word in query_words):
-                    score += 8
-                
-                # Check description matches
-                description = content.get('description', '').lower()
-                for word in query_words:
-                    if word in description:
-                        score += 3
-                
-                # Check procedure text matches
-                procedures = content.get('procedures', [])
-                for procedure in procedures:
-                    for word in query_words:
-                        if word in procedure.lower():
-                            score += 2
-                
-                if score > 0:
-                    results.append({
-                        'score': score,
-                        'category': category,
-                        'topic': topic,
-                        'content': content
-                    })
-        
-        # Sort by score and return top 3 results
-        results.sort(key=lambda x: x['score'], reverse=True)
-        return results[:3]
+        for score, (category, topic) in self.search_index.search(query, limit):
+            results.append({
+                'score': score,
+                'category': category,
+                'topic': topic,
+                'content': self.knowledge_base[category][topic]
+            })
+        return results
 
     @discord.app_commands.command(name="ask_ems", description="Ask a question about EMS procedures")
     async def ask_ems(
@@ -86,8 +135,10 @@ class HelpSystemCog(commands.Cog):
         try:
             # Search knowledge base
             results = self.search_knowledge(question)
+            # Answers are posted publicly, so only student-level material is quoted
+            page_hits = get_asset_index().search(question, 3, allowed=lambda visibility: visibility == "Student")
             
-            if not results:
+            if not results and not page_hits:
                 embed = discord.Embed(
                     title="❓ No Results Found",
                     description=f"I couldn't find information about: **{question}**\n\n"
@@ -136,6 +187,13 @@ class HelpSystemCog(commands.Cog):
                         value=field_value,
                         inline=False
                     )
+                
+                if page_hits:
+                    embed.add_field(
+                        name="📄 Training Material",
+                        value=format_hits(page_hits),
+                        inline=False
+                    )
             
             embed.set_footer(text="EMS Training Bot | Knowledge Base")
             await interaction.followup.send(embed=embed)
@@ -144,6 +202,34 @@ class HelpSystemCog(commands.Cog):
             logger.error(f"Error in ask_ems command: {e}")
             await interaction.followup.send("❌ An error occurred while searching the knowledge base.")
 
+    @ask_ems.autocomplete('question')
+    async def ask_ems_autocomplete(self, interaction: discord.Interaction, current: str):
+        choices = []
+        for category, topic in self.topic_trie.complete(current, 25):
+            question = topic.replace('_', ' ')
+            label = f"{question.title()} ({category.replace('_', ' ')})"
+            choices.append(discord.app_commands.Choice(name=label[:100], value=question[:100]))
+        return choices
+
+    def build_ems_topics_embed(self):
+        """Every knowledge base category with its topics"""
+        embed = discord.Embed(
+            title="📚 Available EMS Topics",
+            description="Browse through our comprehensive EMS knowledge base",
+            color=0x3498db
+        )
+        
+        for category, topics in self.knowledge_base.items():
+            topic_list = "\n".join([f"• {topic}" for topic in topics.keys()])
+            embed.add_field(
+                name=f"📖 {category.title()}",
+                value=topic_list[:1000] + ("..." if len(topic_list) > 1000 else ""),
+                inline=True
+            )
+        
+        embed.set_footer(text="Use /ask_ems <question> to get detailed information")
+        return embed
+
     @discord.app_commands.command(name="ems_topics", description="Browse available EMS knowledge topics")
     async def ems_topics(self, interaction: discord.Interaction):
         """List available knowledge base topics"""
@@ -151,31 +237,15 @@ class HelpSystemCog(commands.Cog):
             if not self.knowledge_base:
                 await interaction.response.send_message("❌ Knowledge base is empty or not loaded.")
                 return
-                
-            embed = discord.Embed(
-                title="📚 Available EMS Topics",
-                description="Browse through our comprehensive EMS knowledge base",
-                color=0x3498db
-            )
             
-            for category, topics in self.knowledge_base.items():
-                topic_list = "\n".join([f"• {topic}" for topic in topics.keys()])
-                embed.add_field(
-                    name=f"📖 {category.title()}",
-                    value=topic_list[:1000] + ("..." if len(topic_list) > 1000 else ""),
-                    inline=True
-                )
-            
-            embed.set_footer(text="Use /ask_ems <question> to get detailed information")
-            await interaction.response.send_message(embed=embed)
+            await interaction.response.send_message(embed=self.embeds.get('ems_topics'))
             
         except Exception as e:
             logger.error(f"Error in ems_topics command: {e}")
             await interaction.response.send_message("❌ An error occurred while loading topics.")
 
-    @discord.app_commands.command(name="emergency_guide", description="Quick emergency procedures guide")
-    async def emergency_guide(self, interaction: discord.Interaction):
-        """Provide quick emergency procedures guide"""
+    def build_emergency_guide_embed(self):
+        """Static quick emergency guide"""
         embed = discord.Embed(
             title="🚨 Quick Emergency Guide",
             description="Essential emergency procedures for EMS flights",
@@ -223,8 +293,14 @@ class HelpSystemCog(commands.Cog):
                   "5. Announce intentions on guard frequency",
             inline=False
         )
-        
-        await interaction.response.send_message(embed=embed)
+        return embed
+
+    @discord.app_commands.command(name="emergency_guide", description="Quick emergency procedures guide")
+    async def emergency_guide(self, interaction: discord.Interaction):
+        """Provide quick emergency procedures guide"""
+        await interaction.response.send_message(embed=self.embeds.get('emergency_guide'))
 
 async def setup(bot):
-    await bot.add_cog(HelpSystemCog(bot))
+    with profile.timed(__name__, 'construct'):
+        cog = HelpSystemCog(bot)
+    await bot.add_cog(cog)
@@ -1,12 +1,25 @@
+import asyncio
 import discord
-from discord.ext import commands
-import json
+from discord.ext import commands, tasks
 import logging
-from pathlib import Path
+import time
 from datetime import datetime, timezone
+from utils.database import get_database
+from utils.leaderboard import LeaderboardIndex, success_rate
+from utils.pagination import Paginator
+from utils.startup import profile
+from utils.storage import EventLog, JSONStore
+from utils.trie import PrefixTrie
 
 logger = logging.getLogger(__name__)
 
+# Snapshot the mission event log once it grows past this size...
+COMPACT_LOG_BYTES = 1_000_000
+# ...or when it has been this long since the last snapshot
+COMPACT_INTERVAL_SECONDS = 6 * 60 * 60
+
+HISTORY_PAGE_SIZE = 5
+
 class MissionsCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
@@ -17,38 +30,184 @@ class MissionsCog(commands.Cog):
             "Trainer": 2,
             "Command": 3
         }
-        self.load_missions()
+        self.next_mission_id = 1
+        self.leaderboard_index = LeaderboardIndex()
+        # user_id -> mission ids, oldest first (JSON backend only)
+        self.user_missions = {}
+        # Autocomplete: pilot names -> user id, and each pilot's mission ids
+        self.pilot_trie = PrefixTrie()
+        self.mission_tries = {}
+        self.db = get_database()
+        self.store = JSONStore('data/missions.json')
+        self.log = EventLog('data/missions.events.jsonl')
+        self.last_compaction = time.monotonic()
+    
+    async def cog_load(self):
+        """Load missions and build indexes off the event loop"""
+        with profile.timed(__name__, 'data load'):
+            await asyncio.to_thread(self.load_missions)
+            await asyncio.to_thread(self.build_autocomplete)
+        if not self.db:
+            self.compactor.start()
         
     def load_missions(self):
         """Load missions database"""
         try:
-            missions_file = Path('data/missions.json')
-            if missions_file.exists():
-                with open(missions_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    self.missions = data.get('missions', {})
-                    self.active_missions = data.get('active_missions', {})
-            else:
-                self.missions = {}
-                self.active_missions = {}
-                self.save_missions()
+            if self.db:
+                # Only open missions are kept in memory; history lives in SQLite
+                active = self.db.records('missions', "WHERE end_time IS NULL")
+                self.missions = {str(mission['id']): mission for mission in active}
+                self.active_missions = {mission['user_id']: mission['id'] for mission in active}
+                last_id = self.db.query("SELECT MAX(id) AS last_id FROM missions")[0]['last_id']
+                self.next_mission_id = (last_id or 0) + 1
+                self.seed_leaderboard()
+                return
+            data = self.store.load()
+            # Older files may hold a bare list
+            if not isinstance(data, dict):
+                data = {}
+            self.missions = data.get('missions', {})
+            self.active_missions = data.get('active_missions', {})
+            # The snapshot is only rewritten on compaction; replay what happened since
+            replayed = 0
+            for event in self.log.replay():
+                self.apply_event(event)
+                replayed += 1
+            if replayed:
+                logger.info(f"Replayed {replayed} mission events")
+            self.next_mission_id = max((int(mission_id) for mission_id in self.missions), default=0) + 1
+            for mission in self.missions.values():
+                self.leaderboard_index.add_mission(mission)
+            self.index_user_missions()
         except Exception as e:
             logger.error(f"Error loading missions: {e}")
             self.missions = {}
             self.active_missions = {}
+            self.next_mission_id = 1
+            self.leaderboard_index = LeaderboardIndex()
+            self.user_missions = {}
+    
+    def index_user_missions(self):
+        """Rebuild the per-pilot list of mission ids in start order"""
+        self.user_missions = {}
+        for mission in sorted(self.missions.values(), key=lambda x: x['start_time']):
+            self.user_missions.setdefault(mission['user_id'], []).append(mission['id'])
+    
+    def seed_leaderboard(self):
+        """Fill the leaderboard index from per-pilot, per-day totals in SQLite"""
+        rows = self.db.query(
+            "SELECT user_id, MAX(user_name) AS user_name, substr(start_time, 1, 10) AS day, "
+            "COUNT(*) AS total, "
+            "SUM(success IS 'true') AS successful, "
+            "SUM(success IS 'partial') AS partial, "
+            "SUM(success IS 'false') AS unsuccessful, "
+            "SUM(CASE WHEN end_time IS NOT NULL "
+            "THEN CAST((julianday(end_time) - julianday(start_time)) * 1440 AS INTEGER) ELSE 0 END) AS minutes "
+            "FROM missions GROUP BY user_id, day"
+        )
+        for row in rows:
+            self.leaderboard_index.bump(
+                row['user_id'], row['user_name'], row['day'],
+                total=row['total'],
+                successful=row['successful'],
+                partial=row['partial'],
+                unsuccessful=row['unsuccessful'],
+                minutes=row['minutes']
+            )
     
-    async def save_missions(self):
-        """Save missions database"""
+    def build_autocomplete(self):
+        """Fill the pilot-name and mission-id tries used by autocomplete"""
         try:
-            Path('data').mkdir(exist_ok=True)
-            data = {
-                'missions': self.missions,
-                'active_missions': self.active_missions
-            }
-            with open('data/missions.json', 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2)
+            for user_id, stats in self.leaderboard_index.stats.items():
+                self.pilot_trie.insert(stats['name'] or user_id, user_id)
+            if self.db:
+                missions = self.db.query("SELECT id, user_id, start_time FROM missions")
+            else:
+                missions = self.missions.values()
+            for mission in missions:
+                self.index_mission_id(mission)
+        except Exception as e:
+            logger.error(f"Error building mission autocomplete: {e}")
+    
+    def index_mission_id(self, mission):
+        trie = self.mission_tries.setdefault(mission['user_id'], PrefixTrie())
+        trie.insert(str(mission['id']), (mission['id'], mission['start_time'][:10]))
+    
+    def snapshot(self):
+        return {
+            'missions': self.missions,
+            'active_missions': self.active_missions
+        }
+    
+    def apply_event(self, event):
+        """Apply a start/end/notes event to the in-memory missions.
+
+        Events carry absolute values, so replaying one twice is harmless.
+        """
+        kind = event.get('event')
+        if kind == 'start':
+            mission = event['mission']
+            self.missions[str(mission['id'])] = mission
+            self.active_missions[mission['user_id']] = mission['id']
+            return mission
+        
+        mission = self.missions.get(str(event.get('id')))
+        if mission is None:
+            logger.warning(f"Mission event for unknown mission: {event}")
+            return None
+        if kind == 'end':
+            mission['end_time'] = event['end_time']
+            mission['success'] = event['success']
+            mission['notes'] = event.get('notes')
+            if self.active_missions.get(mission['user_id']) == mission['id']:
+                del self.active_missions[mission['user_id']]
+        elif kind == 'notes':
+            mission['notes'] = event['notes']
+        return mission
+    
+    async def record_event(self, event):
+        """Apply a mission event, update the leaderboard and persist it"""
+        mission = self.apply_event(event)
+        if event['event'] == 'start':
+            self.leaderboard_index.record_start(mission)
+            self.pilot_trie.insert(mission['user_name'], mission['user_id'])
+            self.index_mission_id(mission)
+            if not self.db:
+                # New missions start last, so appending keeps the list ordered
+                self.user_missions.setdefault(mission['user_id'], []).append(mission['id'])
+        elif event['event'] == 'end':
+            self.leaderboard_index.record_end(mission)
+        if self.db:
+            await self.db.save('missions', [mission])
+            # Finished missions are served from SQLite
+            if mission['end_time']:
+                del self.missions[str(mission['id'])]
+        else:
+            self.log.append(event)
+        return mission
+    
+    async def compact_missions(self):
+        """Fold the event log into a fresh missions.json snapshot"""
+        await self.log.rotate()
+        self.store.save(self.snapshot)
+        if await self.store.flush():
+            self.log.discard_rotated()
+            self.last_compaction = time.monotonic()
+            logger.info("Compacted mission event log")
+    
+    @tasks.loop(minutes=5)
+    async def compactor(self):
+        """Snapshot the event log when it gets large or old"""
+        try:
+            overdue = time.monotonic() - self.last_compaction >= COMPACT_INTERVAL_SECONDS
+            if self.log.size >= COMPACT_LOG_BYTES or (overdue and self.log.size):
+                await self.compact_missions()
         except Exception as e:
-            logger.error(f"Error saving missions: {e}")
+            logger.error(f"Error compacting mission log: {e}")
+    
+    def cog_unload(self):
+        """Clean up when cog is unloaded"""
+        self.compactor.cancel()
     
     def get_user_rank(self, user):
         """Get user's rank"""
@@ -96,7 +255,8 @@ class MissionsCog(commands.Cog):
                 return
             
             # Create mission
-            mission_id = len(self.missions) + 1
+            mission_id = self.next_mission_id
+            self.next_mission_id += 1
             mission = {
                 'id': mission_id,
                 'user_id': user_id,
@@ -110,9 +270,7 @@ class MissionsCog(commands.Cog):
                 'notes': None
             }
             
-            self.missions[str(mission_id)] = mission
-            self.active_missions[user_id] = mission_id
-            await self.save_missions()
+            await self.record_event({'event': 'start', 'mission': mission})
             
             embed = discord.Embed(
                 title="🚁 Mission Started",
@@ -159,14 +317,14 @@ class MissionsCog(commands.Cog):
             mission_id = self.active_missions[user_id]
             mission = self.missions[str(mission_id)]
             
-            # Update mission
-            mission['end_time'] = datetime.now(timezone.utc).isoformat()
-            mission['success'] = success
-            mission['notes'] = notes
-            
-            # Remove from active missions
-            del self.active_missions[user_id]
-            await self.save_missions()
+            # Update mission and remove it from active missions
+            await self.record_event({
+                'event': 'end',
+                'id': mission_id,
+                'end_time': datetime.now(timezone.utc).isoformat(),
+                'success': success,
+                'notes': notes
+            })
             
             # Calculate duration
             start_time = datetime.fromisoformat(mission['start_time'].replace('Z', '+00:00'))
@@ -227,107 +385,197 @@ class MissionsCog(commands.Cog):
             logger.error(f"Error in mission_status command: {e}")
             await ctx.send("❌ An error occurred while checking mission status.")
 
-    @commands.command(name="mission_history")
+    @commands.hybrid_command(name="mission_notes", description="Add or replace the notes on one of your missions")
+    @discord.app_commands.describe(mission_id="One of your mission IDs", notes="Mission notes")
+    async def mission_notes(self, ctx, mission_id: int, *, notes: str):
+        """Add or replace the notes on one of your missions"""
+        try:
+            mission = self.missions.get(str(mission_id))
+            if mission is None and self.db:
+                found = await self.db.fetch_records('missions', "WHERE id = ?", (mission_id,))
+                mission = found[0] if found else None
+            
+            if mission is None:
+                await ctx.send(f"❌ Mission #{mission_id} not found.")
+                return
+            if mission['user_id'] != str(ctx.author.id):
+                await ctx.send("❌ You can only add notes to your own missions.")
+                return
+            
+            # Finished missions only live in SQLite; bring it back for the update
+            self.missions.setdefault(str(mission_id), mission)
+            await self.record_event({'event': 'notes', 'id': mission_id, 'notes': notes})
+            await ctx.send(f"📝 Updated notes for mission #{mission_id}.")
+            
+        except Exception as e:
+            logger.error(f"Error in mission_notes command: {e}")
+            await ctx.send("❌ An error occurred while updating mission notes.")
+
+    @mission_notes.autocomplete('mission_id')
+    async def mission_notes_autocomplete(self, interaction: discord.Interaction, current: str):
+        trie = self.mission_tries.get(str(interaction.user.id))
+        if trie is None:
+            return []
+        return [discord.app_commands.Choice(name=f"#{mission_id} · {day}", value=mission_id)
+                for mission_id, day in trie.complete(current.lstrip('#'), 25)]
+
+    def find_pilots(self, name):
+        """User ids of pilots whose name contains the given text"""
+        name = name.lower()
+        return [user_id for user_id, stats in self.leaderboard_index.stats.items()
+                if name in (stats['name'] or '').lower()]
+
+    def history_pages(self, user_ids):
+        """Return (get_page, total) for the given pilots' missions, newest first.
+
+        Pages come from the per-pilot index (JSON) or an indexed keyset query
+        (SQLite), so paging never touches other pilots' missions.
+        """
+        if self.db:
+            total = sum(self.leaderboard_index.stats.get(user_id, {}).get('total', 0) for user_id in user_ids)
+            placeholders = ', '.join('?' * len(user_ids))
+            # cursors[page] is the (start_time, id) of the last mission on the previous page
+            cursors = {0: None}
+
+            async def get_page(page):
+                cursor = cursors.get(page)
+                where = f"WHERE user_id IN ({placeholders})"
+                params = list(user_ids)
+                if cursor is not None:
+                    where += " AND (start_time, id) < (?, ?)"
+                    params += list(cursor)
+                elif page != 0:
+                    return []
+                missions = await self.db.fetch_records(
+                    'missions', where + " ORDER BY start_time DESC, id DESC LIMIT ?", params + [HISTORY_PAGE_SIZE]
+                )
+                if missions:
+                    cursors[page + 1] = (missions[-1]['start_time'], missions[-1]['id'])
+                return missions
+
+            return get_page, total
+
+        if len(user_ids) == 1:
+            mission_ids = self.user_missions.get(user_ids[0], [])
+        else:
+            lists = [self.user_missions.get(user_id, []) for user_id in user_ids]
+            mission_ids = [mission_id for ids in lists for mission_id in ids]
+            mission_ids.sort(key=lambda mission_id: self.missions[str(mission_id)]['start_time'])
+
+        async def get_page(page):
+            end = len(mission_ids) - page * HISTORY_PAGE_SIZE
+            start = max(end - HISTORY_PAGE_SIZE, 0)
+            return [self.missions[str(mission_id)] for mission_id in reversed(mission_ids[start:max(end, 0)])]
+
+        return get_page, len(mission_ids)
+
+    def build_history_embed(self, pilot_name, missions, page, page_count):
+        """Render one page of mission history"""
+        embed = discord.Embed(
+            title="📋 Mission History",
+            description=f"Recent missions for {pilot_name}",
+            color=0x3498db
+        )
+        
+        for mission in missions:
+            success_emoji = "✅" if mission.get('success') == "true" else "⚠️" if mission.get('success') == "partial" else "❌" if mission.get('success') == "false" else "🔄"
+            
+            start_time = datetime.fromisoformat(mission['start_time'].replace('Z', '+00:00'))
+            if mission.get('end_time'):
+                end_time = datetime.fromisoformat(mission['end_time'].replace('Z', '+00:00'))
+                duration = end_time - start_time
+                duration_text = f"{duration.seconds // 60} minutes"
+            else:
+                duration_text = "In progress"
+            
+            embed.add_field(
+                name=f"{success_emoji} {mission['type']} (#{mission['id']})",
+                value=f"**Location:** {mission['location']}\n**Duration:** {duration_text}\n**Date:** <t:{int(start_time.timestamp())}:d>",
+                inline=True
+            )
+        
+        if page_count > 1:
+            embed.set_footer(text=f"Page {page + 1}/{page_count}")
+        return embed
+
+    @commands.hybrid_command(name="mission_history", description="View mission history")
+    @discord.app_commands.describe(user="Pilot name (defaults to you)")
     async def mission_history(self, ctx, user: str = None):
         """View mission history"""
         try:
-            target_user = ctx.author if user is None else None
+            if user is None:
+                user_ids = [str(ctx.author.id)]
+                pilot_name = ctx.author.display_name
+            else:
+                user_ids = self.find_pilots(user)
+                pilot_name = user
             
-            # Filter missions
-            user_missions = []
-            for mission in self.missions.values():
-                if user is None:
-                    if mission['user_id'] == str(ctx.author.id):
-                        user_missions.append(mission)
-                else:
-                    if user.lower() in mission['user_name'].lower():
-                        user_missions.append(mission)
-            
-            if not user_missions:
+            get_page, total = self.history_pages(user_ids) if user_ids else (None, 0)
+            if not total:
                 await ctx.send("📋 No mission history found.")
                 return
             
-            # Sort by start time (newest first)
-            user_missions.sort(key=lambda x: x['start_time'], reverse=True)
+            page_count = (total + HISTORY_PAGE_SIZE - 1) // HISTORY_PAGE_SIZE
             
-            embed = discord.Embed(
-                title="📋 Mission History",
-                description=f"Recent missions for {target_user.display_name if target_user else user}",
-                color=0x3498db
-            )
+            async def render(page):
+                return self.build_history_embed(pilot_name, await get_page(page), page, page_count)
             
-            for mission in user_missions[:5]:  # Show last 5 missions
-                success_emoji = "✅" if mission.get('success') == "true" else "⚠️" if mission.get('success') == "partial" else "❌" if mission.get('success') == "false" else "🔄"
-                
-                start_time = datetime.fromisoformat(mission['start_time'].replace('Z', '+00:00'))
-                if mission.get('end_time'):
-                    end_time = datetime.fromisoformat(mission['end_time'].replace('Z', '+00:00'))
-                    duration = end_time - start_time
-                    duration_text = f"{duration.seconds // 60} minutes"
-                else:
-                    duration_text = "In progress"
-                
-                embed.add_field(
-                    name=f"{success_emoji} {mission['type']} (#{mission['id']})",
-                    value=f"**Location:** {mission['location']}\n**Duration:** {duration_text}\n**Date:** <t:{int(start_time.timestamp())}:d>",
-                    inline=True
-                )
+            embed = await render(0)
+            if page_count == 1:
+                await ctx.send(embed=embed)
+                return
             
-            await ctx.send(embed=embed)
+            view = Paginator(render, page_count, ctx.author.id)
+            view.message = await ctx.send(embed=embed, view=view)
             
         except Exception as e:
             logger.error(f"Error in mission_history command: {e}")
             await ctx.send("❌ An error occurred while loading mission history.")
 
+    @mission_history.autocomplete('user')
+    async def mission_history_autocomplete(self, interaction: discord.Interaction, current: str):
+        names = dict.fromkeys(self.leaderboard_index.stats[user_id]['name'] or user_id
+                              for user_id in self.pilot_trie.complete(current, 25))
+        return [discord.app_commands.Choice(name=name[:100], value=name[:100]) for name in names]
+
     @commands.command(name="leaderboard")
-    async def leaderboard(self, ctx):
-        """Display mission leaderboard"""
+    async def leaderboard(self, ctx, ranking: str = "missions", days: int = None):
+        """Display mission leaderboard (ranking: missions, success or minutes; optional window in days)"""
         try:
-            # Calculate stats
-            user_stats = {}
-            for mission in self.missions.values():
-                user_id = mission['user_id']
-                user_name = mission['user_name']
-                
-                if user_id not in user_stats:
-                    user_stats[user_id] = {
-                        'name': user_name,
-                        'total': 0,
-                        'successful': 0,
-                        'unsuccessful': 0,
-                        'partial': 0
-                    }
-                
-                user_stats[user_id]['total'] += 1
-                
-                success = mission.get('success')
-                if success == "true":
-                    user_stats[user_id]['successful'] += 1
-                elif success == "false":
-                    user_stats[user_id]['unsuccessful'] += 1
-                elif success == "partial":
-                    user_stats[user_id]['partial'] += 1
-            
-            if not user_stats:
-                await ctx.send("📊 No mission data available for leaderboard.")
+            rankings = {
+                'missions': ('total', "mission count"),
+                'success': ('success_rate', "success rate"),
+                'minutes': ('minutes', "flight minutes")
+            }
+            if ranking.lower() not in rankings:
+                await ctx.send("❌ Ranking must be one of: missions, success, minutes.")
                 return
+            if days is not None and not 1 <= days <= 365:
+                await ctx.send("❌ Days must be between 1 and 365.")
+                return
+            
+            metric, label = rankings[ranking.lower()]
+            top_users = self.leaderboard_index.top(metric, limit=10, days=days)
             
-            # Sort by total missions
-            sorted_users = sorted(user_stats.items(), key=lambda x: x[1]['total'], reverse=True)
+            if not top_users:
+                await ctx.send("📊 No mission data available for leaderboard.")
+                return
             
+            description = f"Top pilots by {label}"
+            if days:
+                description += f" over the last {days} day(s)"
             embed = discord.Embed(
                 title="🏆 Mission Leaderboard",
-                description="Top pilots by mission count",
+                description=description,
                 color=0xffd700
             )
             
-            for i, (user_id, stats) in enumerate(sorted_users[:10], 1):
-                success_rate = (stats['successful'] / stats['total'] * 100) if stats['total'] > 0 else 0
-                
+            for i, (user_id, stats) in enumerate(top_users, 1):
                 embed.add_field(
                     name=f"{i}. {stats['name']}",
                     value=f"**Total:** {stats['total']} missions\n"
-                          f"**Success Rate:** {success_rate:.1f}%\n"
+                          f"**Success Rate:** {success_rate(stats):.1f}%\n"
+                          f"**Flight Time:** {stats['minutes']} minutes\n"
                           f"✅ {stats['successful']} | ⚠️ {stats['partial']} | ❌ {stats['unsuccessful']}",
                     inline=True
                 )
@@ -339,4 +587,6 @@ class MissionsCog(commands.Cog):
             await ctx.send("❌ An error occurred while loading leaderboard.")
 
 async def setup(bot):
-    await bot.add_cog(MissionsCog(bot))
\ No newline at end of file
+    with profile.timed(__name__, 'construct'):
+        cog = MissionsCog(bot)
+    await bot.add_cog(cog)
\ No newline at end of file
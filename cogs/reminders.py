@@ -1,13 +1,25 @@
 import discord
-from discord.ext import commands, tasks
-import json
+from discord.ext import commands
+import asyncio
 import logging
-from pathlib import Path
 from datetime import datetime, timezone, timedelta
-import asyncio
+from utils.database import get_database
+from utils.metrics import metrics
+from utils.scheduler import TimerHeap
+from utils.startup import profile
+from utils.storage import JSONStore
+from utils.trie import PrefixTrie
 
 logger = logging.getLogger(__name__)
 
+# Upper bound on one scheduler sleep, so wall-clock changes are picked up
+MAX_SLEEP_SECONDS = 300
+
+# Channels delivered to at once; each channel's messages go out in order
+DELIVERY_CONCURRENCY = 8
+# Discord's limit on embeds in a single message
+EMBEDS_PER_MESSAGE = 10
+
 class RemindersCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
@@ -17,39 +29,57 @@ class RemindersCog(commands.Cog):
             "Trainer": 2,
             "Command": 3
         }
-        self.load_reminders()
-        self.reminder_check.start()
+        self.next_reminder_id = 1
+        self.db = get_database()
+        self.store = JSONStore('data/reminders.json')
+        # Active reminders only, keyed by id and ordered by next fire time
+        self.timers = TimerHeap()
+        # Active reminders by id and message words, for autocomplete
+        self.reminder_trie = PrefixTrie()
+        self.wakeup = asyncio.Event()
+        self.scheduler_task = None
         
     def load_reminders(self):
         """Load reminders database"""
         try:
-            reminders_file = Path('data/reminders.json')
-            if reminders_file.exists():
-                with open(reminders_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    # Ensure we have a dict, not a list
-                    if isinstance(data, dict):
-                        self.reminders = data
-                    else:
-                        self.reminders = {}
+            if self.db:
+                # Fired and cancelled reminders stay in SQLite only
+                active = self.db.records('reminders', "WHERE active = 1")
+                self.reminders = {str(reminder['id']): reminder for reminder in active}
+                last_id = self.db.query("SELECT MAX(id) AS last_id FROM reminders")[0]['last_id']
+                self.next_reminder_id = (last_id or 0) + 1
+                for reminder_id, reminder in self.reminders.items():
+                    self.timers.schedule(reminder_id, self.reminder_timestamp(reminder))
+                    self.reminder_trie.insert(f"{reminder_id} {reminder['message']}", reminder_id)
+                return
+            data = self.store.load()
+            # Ensure we have a dict, not a list
+            if isinstance(data, dict):
+                self.reminders = data
             else:
                 self.reminders = {}
-                # Create empty file
-                Path('data').mkdir(exist_ok=True)
-                with open('data/reminders.json', 'w', encoding='utf-8') as f:
-                    json.dump({}, f, indent=2)
+            self.next_reminder_id = max((int(reminder_id) for reminder_id in self.reminders), default=0) + 1
+            for reminder_id, reminder in self.reminders.items():
+                if reminder.get('active', True):
+                    self.timers.schedule(reminder_id, self.reminder_timestamp(reminder))
+                    self.reminder_trie.insert(f"{reminder_id} {reminder['message']}", reminder_id)
         except Exception as e:
             logger.error(f"Error loading reminders: {e}")
             self.reminders = {}
+            self.next_reminder_id = 1
+            self.timers = TimerHeap()
+            self.reminder_trie = PrefixTrie()
     
-    async def save_reminders(self):
-        """Save reminders database"""
-        try:
-            Path('data').mkdir(exist_ok=True)
-            with open('data/reminders.json', 'w', encoding='utf-8') as f:
-                json.dump(self.reminders, f, indent=2)
-        except Exception as e:
-            logger.error(f"Error saving reminders: {e}")
+    async def save_reminders(self, *changed):
+        """Persist changed reminders (SQLite) or queue the reminders database for writing"""
+        if self.db:
+            await self.db.save('reminders', changed)
+            return
+        self.store.save(lambda: self.reminders)
+    
+    @staticmethod
+    def reminder_timestamp(reminder):
+        return datetime.fromisoformat(reminder['reminder_time'].replace('Z', '+00:00')).timestamp()
     
     def get_user_rank(self, user):
         """Get user's rank"""
@@ -94,7 +124,8 @@ class RemindersCog(commands.Cog):
             reminder_time = datetime.now(timezone.utc) + timedelta(minutes=minutes)
             
             # Create reminder
-            reminder_id = len(self.reminders) + 1
+            reminder_id = self.next_reminder_id
+            self.next_reminder_id += 1
             reminder = {
                 'id': reminder_id,
                 'message': message,
@@ -108,7 +139,10 @@ class RemindersCog(commands.Cog):
             }
             
             self.reminders[str(reminder_id)] = reminder
-            await self.save_reminders()
+            self.timers.schedule(str(reminder_id), reminder_time.timestamp())
+            self.reminder_trie.insert(f"{reminder_id} {message}", str(reminder_id))
+            self.wakeup.set()
+            await self.save_reminders(reminder)
             
             embed = discord.Embed(
                 title="⏰ Reminder Scheduled",
@@ -159,7 +193,8 @@ class RemindersCog(commands.Cog):
             logger.error(f"Error in view_reminders command: {e}")
             await ctx.send("❌ An error occurred while loading reminders.")
 
-    @commands.command(name="cancel_reminder")
+    @commands.hybrid_command(name="cancel_reminder", description="Cancel a scheduled reminder (Trainer+ only)")
+    @discord.app_commands.describe(reminder_id="Reminder ID")
     async def cancel_reminder(self, ctx, reminder_id: str):
         """Cancel a scheduled reminder"""
         try:
@@ -177,7 +212,10 @@ class RemindersCog(commands.Cog):
             
             reminder = self.reminders[reminder_id]
             reminder['active'] = False
-            await self.save_reminders()
+            self.timers.remove(reminder_id)
+            self.reminder_trie.remove(reminder_id)
+            self.wakeup.set()
+            await self.save_reminders(reminder)
             
             await ctx.send(f"✅ Cancelled reminder #{reminder_id}: **{reminder['message'][:50]}...**")
             
@@ -185,91 +223,145 @@ class RemindersCog(commands.Cog):
             logger.error(f"Error in cancel_reminder command: {e}")
             await ctx.send("❌ An error occurred while cancelling the reminder.")
 
-    @tasks.loop(minutes=1)
+    @cancel_reminder.autocomplete('reminder_id')
+    async def cancel_reminder_autocomplete(self, interaction: discord.Interaction, current: str):
+        if self.rank_hierarchy.get(self.get_user_rank(interaction.user), 0) < 2:
+            return []
+        choices = []
+        for reminder_id in self.reminder_trie.complete(current.lstrip('#'), 25):
+            label = f"#{reminder_id} — {self.reminders[reminder_id]['message']}"
+            choices.append(discord.app_commands.Choice(name=label[:100], value=reminder_id))
+        return choices
+
     async def reminder_check(self):
-        """Check for reminders that need to be sent"""
-        try:
-            current_time = datetime.now(timezone.utc)
-            
-            # Ensure reminders is a dict
-            if not isinstance(self.reminders, dict):
-                logger.warning("Reminders data corrupted, resetting to empty dict")
-                self.reminders = {}
-                await self.save_reminders()
-                return
-                
-            for reminder_id, reminder in list(self.reminders.items()):
-                if not reminder.get('active', True):
-                    continue
+        """Send every reminder that is due now, as one batch"""
+        with metrics.timed('task', 'reminders.reminder_check'):
+            await self.deliver_due()
+
+    async def deliver_due(self):
+        now = datetime.now(timezone.utc).timestamp()
+        due = []
+        for reminder_id in self.timers.pop_due(now):
+            reminder = self.reminders.get(reminder_id)
+            if reminder is not None and reminder.get('active', True):
+                due.append(reminder)
+        if not due:
+            return
+        
+        by_channel = {}
+        for reminder in due:
+            by_channel.setdefault(reminder['channel_id'], []).append(reminder)
+        
+        semaphore = asyncio.Semaphore(DELIVERY_CONCURRENCY)
+        
+        async def deliver(channel_id, reminders):
+            async with semaphore:
+                await self.send_reminders(channel_id, reminders)
+        
+        await asyncio.gather(*(deliver(channel_id, reminders) for channel_id, reminders in by_channel.items()))
+        
+        for reminder in due:
+            # Handle repeat reminders
+            repeat_type = reminder.get('repeat', 'None')
+            if repeat_type != 'None':
+                await self.schedule_repeat(reminder, repeat_type, now)
+                self.timers.schedule(str(reminder['id']), self.reminder_timestamp(reminder))
+            else:
+                # Mark as inactive for one-time reminders
+                reminder['active'] = False
+                self.reminder_trie.remove(str(reminder['id']))
+        
+        await self.save_reminders(*due)
+
+    async def run_scheduler(self):
+        """Sleep until the next reminder is due, fire it, repeat"""
+        await self.bot.wait_until_ready()
+        while True:
+            try:
+                # New or cancelled reminders set the event so the sleep is recalculated
+                self.wakeup.clear()
+                await self.reminder_check()
                 
-                reminder_time = datetime.fromisoformat(reminder['reminder_time'].replace('Z', '+00:00'))
+                next_due = self.timers.next_due()
+                timeout = MAX_SLEEP_SECONDS
+                if next_due is not None:
+                    timeout = min(max(next_due - datetime.now(timezone.utc).timestamp(), 0), MAX_SLEEP_SECONDS)
                 
-                # Check if it's time to send the reminder
-                if current_time >= reminder_time:
-                    await self.send_reminder(reminder)
-                    
-                    # Handle repeat reminders
-                    repeat_type = reminder.get('repeat', 'None')
-                    if repeat_type != 'None':
-                        await self.schedule_repeat(reminder, repeat_type)
-                    else:
-                        # Mark as inactive for one-time reminders
-                        reminder['active'] = False
-                    
-                    await self.save_reminders()
-                    
-        except Exception as e:
-            logger.error(f"Error in reminder check: {e}")
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in reminder scheduler: {e}")
+                await asyncio.sleep(1)
 
-    async def send_reminder(self, reminder):
-        """Send a reminder message"""
-        try:
-            channel = self.bot.get_channel(int(reminder['channel_id']))
-            if not channel:
-                logger.warning(f"Channel {reminder['channel_id']} not found for reminder {reminder['id']}")
-                return
-            
-            embed = discord.Embed(
-                title="⏰ Scheduled Reminder",
-                description=reminder['message'],
-                color=0xffa500
-            )
-            embed.add_field(name="Created By", value=reminder.get('created_by_name', 'Unknown'), inline=True)
-            embed.add_field(name="Reminder ID", value=f"#{reminder['id']}", inline=True)
-            
-            await channel.send(content="📢 **REMINDER**", embed=embed)
-            logger.info(f"Sent reminder {reminder['id']} to channel {reminder['channel_id']}")
-            
-        except Exception as e:
-            logger.error(f"Error sending reminder {reminder.get('id', 'unknown')}: {e}")
+    def build_reminder_embed(self, reminder):
+        embed = discord.Embed(
+            title="⏰ Scheduled Reminder",
+            description=reminder['message'],
+            color=0xffa500
+        )
+        embed.add_field(name="Created By", value=reminder.get('created_by_name', 'Unknown'), inline=True)
+        embed.add_field(name="Reminder ID", value=f"#{reminder['id']}", inline=True)
+        return embed
+
+    async def send_reminders(self, channel_id, reminders):
+        """Send a channel's due reminders, up to ten embeds per message.
 
-    async def schedule_repeat(self, reminder, repeat_type):
-        """Schedule the next occurrence of a repeating reminder"""
+        Messages to one channel share a Discord rate-limit bucket, so they go
+        out one after another and discord.py's bucket handling paces them;
+        different channels are delivered concurrently by reminder_check.
+        """
+        channel = self.bot.get_channel(int(channel_id))
+        if not channel:
+            logger.warning(f"Channel {channel_id} not found for reminders {[r['id'] for r in reminders]}")
+            return
+        
+        for start in range(0, len(reminders), EMBEDS_PER_MESSAGE):
+            batch = reminders[start:start + EMBEDS_PER_MESSAGE]
+            try:
+                await channel.send(content="📢 **REMINDER**", embeds=[self.build_reminder_embed(r) for r in batch])
+                logger.info(f"Sent reminders {[r['id'] for r in batch]} to channel {channel_id}")
+            except Exception as e:
+                logger.error(f"Error sending reminders {[r['id'] for r in batch]}: {e}")
+
+    async def schedule_repeat(self, reminder, repeat_type, now):
+        """Schedule the next occurrence of a repeating reminder after `now` (a timestamp)"""
         try:
             current_time = datetime.fromisoformat(reminder['reminder_time'].replace('Z', '+00:00'))
             
             if repeat_type == 'Daily':
-                next_time = current_time + timedelta(days=1)
+                step = timedelta(days=1)
             elif repeat_type == 'Weekly':
-                next_time = current_time + timedelta(weeks=1)
+                step = timedelta(weeks=1)
             elif repeat_type == 'Monthly':
-                next_time = current_time + timedelta(days=30)  # Approximate month
+                step = timedelta(days=30)  # Approximate month
             else:
                 return
             
+            # Skip occurrences missed while the bot was down, so an overdue reminder fires once, not once per period
+            missed = max((datetime.fromtimestamp(now, current_time.tzinfo) - current_time) // step, 0)
+            next_time = current_time + (missed + 1) * step
+            
             reminder['reminder_time'] = next_time.isoformat()
             
         except Exception as e:
             logger.error(f"Error scheduling repeat for reminder {reminder.get('id', 'unknown')}: {e}")
 
-    @reminder_check.before_loop
-    async def before_reminder_check(self):
-        """Wait for bot to be ready before starting reminder check"""
-        await self.bot.wait_until_ready()
+    async def cog_load(self):
+        """Load reminders off the event loop, then start the reminder scheduler"""
+        with profile.timed(__name__, 'data load'):
+            await asyncio.to_thread(self.load_reminders)
+        self.scheduler_task = asyncio.create_task(self.run_scheduler())
 
     def cog_unload(self):
         """Clean up when cog is unloaded"""
-        self.reminder_check.cancel()
+        if self.scheduler_task:
+            self.scheduler_task.cancel()
 
 async def setup(bot):
-    await bot.add_cog(RemindersCog(bot))
\ No newline at end of file
+    with profile.timed(__name__, 'construct'):
+        cog = RemindersCog(bot)
+    await bot.add_cog(cog)
\ No newline at end of file
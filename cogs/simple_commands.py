@@ -4,90 +4,139 @@ import json
 import logging
 from pathlib import Path
 from datetime import datetime, timezone
+from utils.embeds import EmbedCache
+from utils.metrics import metrics
+from utils.startup import profile
 
 logger = logging.getLogger(__name__)
 
+# Handlers listed by /perf
+PERF_ROWS = 10
+
 class SimpleCommandsCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.embeds = EmbedCache()
+        self.embeds.register('help_ems', self.build_help_embed)
+        self.embeds.register('status', self.build_status_embed)
+        self.embeds.warm()
         self.setup_slash_commands()
         
+    def build_help_embed(self):
+        """Command overview for /help_ems"""
+        embed = discord.Embed(
+            title="🚁 EMS Training Bot Commands",
+            description="Available commands for EMS flight training",
+            color=0x3498db
+        )
+        
+        embed.add_field(
+            name="📢 Alert System",
+            value="• Type emergency keywords (mayday, engine failure, crash) to trigger alerts\n"
+                  "• `/emergency_info` - Emergency procedures guide",
+            inline=False
+        )
+        
+        embed.add_field(
+            name="🧠 Help System", 
+            value="• `/ask_ems <question>` - Ask EMS questions\n"
+                  "• `/ems_topics` - Browse knowledge topics\n"
+                  "• `/emergency_guide` - Quick emergency guide",
+            inline=False
+        )
+        
+        embed.add_field(
+            name="📁 Document System",
+            value="• `/docs` - View training documents\n"
+                  "• `/upload_doc` - Upload document (Trainer+)\n"
+                  "• `/doc_categories` - View categories",
+            inline=False
+        )
+        
+        embed.add_field(
+            name="🛫 Mission System",
+            value="• `/start_mission <type>` - Start new mission\n"
+                  "• `/end_mission <success>` - End mission\n"
+                  "• `/mission_status` - Check current mission\n"
+                  "• `/mission_history` - View history\n"
+                  "• `/leaderboard [missions|success|minutes] [days]` - Mission leaderboard",
+            inline=False
+        )
+        
+        embed.add_field(
+            name="🎖️ Rank System",
+            value="• `/rank [user]` - Check rank\n"
+                  "• `/promote <user> <rank>` - Promote user (Command)\n"
+                  "• `/ranks` - View all ranks\n"
+                  "• `/staff` - View staff members",
+            inline=False
+        )
+        
+        embed.add_field(
+            name="⏰ Reminders",
+            value="• `/schedule <message> <time>` - Schedule reminder (Trainer+)\n"
+                  "• `/reminders` - View scheduled reminders\n"
+                  "• `/cancel_reminder <id>` - Cancel reminder",
+            inline=False
+        )
+        
+        embed.set_footer(text="EMS Training Bot | Emergency Medical Services Flight Training")
+        return embed
+    
+    def build_status_embed(self):
+        """Static part of /status; live numbers are added per call"""
+        embed = discord.Embed(
+            title="🤖 Bot Status",
+            description="EMS Training Bot is online and operational",
+            color=0x00ff00
+        )
+        embed.add_field(name="🔧 Features Available", value="✅ Emergency Alerts\n✅ AI Help System\n✅ Document Management\n✅ Mission Logging\n✅ Rank System\n✅ Reminders", inline=True)
+        return embed
+        
     def setup_slash_commands(self):
         """Setup slash commands manually"""
         @self.bot.tree.command(name="help_ems", description="Get help with EMS commands")
         async def help_ems(interaction: discord.Interaction):
-            embed = discord.Embed(
-                title="🚁 EMS Training Bot Commands",
-                description="Available commands for EMS flight training",
-                color=0x3498db
-            )
-            
-            embed.add_field(
-                name="📢 Alert System",
-                value="• Type emergency keywords (mayday, engine failure, crash) to trigger alerts\n"
-                      "• `/emergency_info` - Emergency procedures guide",
-                inline=False
-            )
-            
-            embed.add_field(
-                name="🧠 Help System", 
-                value="• `/ask_ems <question>` - Ask EMS questions\n"
-                      "• `/ems_topics` - Browse knowledge topics\n"
-                      "• `/emergency_guide` - Quick emergency guide",
-                inline=False
-            )
-            
-            embed.add_field(
-                name="📁 Document System",
-                value="• `/docs` - View training documents\n"
-                      "• `/upload_doc` - Upload document (Trainer+)\n"
-                      "• `/doc_categories` - View categories",
-                inline=False
-            )
-            
-            embed.add_field(
-                name="🛫 Mission System",
-                value="• `/start_mission <type>` - Start new mission\n"
-                      "• `/end_mission <success>` - End mission\n"
-                      "• `/mission_status` - Check current mission\n"
-                      "• `/mission_history` - View history\n"
-                      "• `/leaderboard` - Mission leaderboard",
-                inline=False
-            )
-            
-            embed.add_field(
-                name="🎖️ Rank System",
-                value="• `/rank [user]` - Check rank\n"
-                      "• `/promote <user> <rank>` - Promote user (Command)\n"
-                      "• `/ranks` - View all ranks\n"
-                      "• `/staff` - View staff members",
-                inline=False
-            )
-            
-            embed.add_field(
-                name="⏰ Reminders",
-                value="• `/schedule <message> <time>` - Schedule reminder (Trainer+)\n"
-                      "• `/reminders` - View scheduled reminders\n"
-                      "• `/cancel_reminder <id>` - Cancel reminder",
-                inline=False
-            )
-            
-            embed.set_footer(text="EMS Training Bot | Emergency Medical Services Flight Training")
-            await interaction.response.send_message(embed=embed)
+            await interaction.response.send_message(embed=self.embeds.get('help_ems'))
         
         @self.bot.tree.command(name="status", description="Check bot status")
         async def status(interaction: discord.Interaction):
-            embed = discord.Embed(
-                title="🤖 Bot Status",
-                description="EMS Training Bot is online and operational",
-                color=0x00ff00,
-                timestamp=datetime.now(timezone.utc)
-            )
-            
-            embed.add_field(name="🔧 Features Available", value="✅ Emergency Alerts\n✅ AI Help System\n✅ Document Management\n✅ Mission Logging\n✅ Rank System\n✅ Reminders", inline=True)
+            embed = self.embeds.copy('status')
+            embed.timestamp = datetime.now(timezone.utc)
             embed.add_field(name="📊 Server", value=f"Guilds: {len(self.bot.guilds)}\nLatency: {round(self.bot.latency * 1000)}ms", inline=True)
+            if profile.finished:
+                slowest = "\n".join(f"{component}: {seconds * 1000:.0f}ms" for component, seconds in profile.slowest(3))
+                embed.add_field(name="⏱️ Startup", value=f"Total: {profile.total:.2f}s\n{slowest}", inline=False)
             
             await interaction.response.send_message(embed=embed)
+        
+        @self.bot.tree.command(name="perf", description="Slowest commands and handlers since startup")
+        async def perf(interaction: discord.Interaction):
+            await interaction.response.send_message(embed=self.build_perf_embed(), ephemeral=True)
+    
+    def build_perf_embed(self, limit=PERF_ROWS):
+        """Latency summary of the slowest handlers, from utils.metrics"""
+        embed = discord.Embed(
+            title="⏱️ Performance",
+            description="Handler latency since startup, slowest p95 first. Full histograms are at `/metrics` on the status server.",
+            color=0x3498db,
+            timestamp=datetime.now(timezone.utc)
+        )
+        rows = metrics.summary(limit)
+        if not rows:
+            embed.add_field(name="No data yet", value="Nothing has been handled since startup.", inline=False)
+        for row in rows:
+            errors = f" • ❌ {row['errors']} errors" if row['errors'] else ""
+            embed.add_field(
+                name=f"{row['name']} ({row['kind']})",
+                value=f"{row['calls']} calls{errors}\n"
+                      f"p50 {row['p50'] * 1000:.0f}ms • p95 {row['p95'] * 1000:.0f}ms • max {row['max'] * 1000:.0f}ms",
+                inline=False
+            )
+        embed.add_field(name="📡 Gateway", value=f"Latency: {round(self.bot.latency * 1000)}ms", inline=False)
+        return embed
 
 async def setup(bot):
-    await bot.add_cog(SimpleCommandsCog(bot))
\ No newline at end of file
+    with profile.timed(__name__, 'construct'):
+        cog = SimpleCommandsCog(bot)
+    await bot.add_cog(cog)
\ No newline at end of file
@@ -1,15 +1,17 @@
-from flask import Flask
-import threading
 import logging
+import math
+import os
+import time
+from aiohttp import web
+from utils import storage
+from utils.metrics import metrics
+from utils.watchdog import LoopWatchdog
 
-# Setup logging for Flask
-logging.getLogger('werkzeug').setLevel(logging.ERROR)
+logger = logging.getLogger(__name__)
 
-app = Flask(__name__)
+METRICS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
 
-@app.route('/')
-def home():
-    return '''
+HOME_PAGE = '''
     <html>
         <head>
             <title>EMS Training Bot</title>
@@ -39,16 +41,88 @@ def home():
     </html>
     '''
 
-@app.route('/health')
-def health():
-    return {'status': 'healthy', 'service': 'EMS Training Bot'}
-
-def keep_alive():
-    """Start Flask server in a separate thread"""
-    def run():
-        app.run(host='0.0.0.0', port=5000, debug=False)
-    
-    server = threading.Thread(target=run)
-    server.daemon = True
-    server.start()
-    print("Keep-alive server started on port 5000")
+
+class HealthServer:
+    """Status page and /health endpoint served by aiohttp on the bot's own event loop"""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.started = time.monotonic()
+        self.watchdog = LoopWatchdog()
+        self.app = web.Application()
+        self.app.router.add_get('/', self.home)
+        self.app.router.add_get('/health', self.health)
+        self.app.router.add_get('/metrics', self.metrics)
+        self.runner = None
+
+    async def home(self, request):
+        return web.Response(text=HOME_PAGE, content_type='text/html')
+
+    def health_report(self):
+        bot = self.bot
+        latency = bot.latency
+        pending = storage.pending_stores()
+        if bot.is_closed():
+            status = 'stopped'
+        elif not bot.is_ready():
+            status = 'starting'
+        else:
+            status = 'healthy'
+        return {
+            'status': status,
+            'service': 'EMS Training Bot',
+            'uptime_seconds': round(time.monotonic() - self.started),
+            'gateway_latency_ms': round(latency * 1000, 1) if math.isfinite(latency) else None,
+            'loop_lag_ms': {'last': round(self.watchdog.last * 1000, 1), 'peak': round(self.watchdog.peak * 1000, 1)},
+            'loop_stalls': {'count': self.watchdog.stalls, 'threshold_ms': round(self.watchdog.threshold * 1000), 'recent': list(self.watchdog.recent)[-5:]},
+            'guilds': len(bot.guilds),
+            'cogs': dict(getattr(bot, 'cog_status', {})),
+            'storage_backlog': {'pending_stores': len(pending), 'paths': sorted(str(store.path) for store in pending)}
+        }
+
+    async def health(self, request):
+        report = self.health_report()
+        return web.json_response(report, status=200 if report['status'] == 'healthy' else 503)
+
+    async def metrics(self, request):
+        """Prometheus scrape target"""
+        latency = self.bot.latency
+        if math.isfinite(latency):
+            metrics.set_gauge('ems_gateway_latency_seconds', 'Discord gateway heartbeat latency.', latency)
+        metrics.set_gauge('ems_loop_lag_seconds', 'Most recent event loop scheduling delay.', self.watchdog.last)
+        metrics.set_gauge('ems_loop_lag_peak_seconds', 'Largest event loop scheduling delay since startup.', self.watchdog.peak)
+        metrics.set_gauge('ems_guilds', 'Guilds the bot is in.', len(self.bot.guilds))
+        metrics.set_gauge('ems_storage_pending_stores', 'Data files with unflushed writes.', len(storage.pending_stores()))
+        return web.Response(body=metrics.render().encode('utf-8'), headers={'Content-Type': METRICS_CONTENT_TYPE})
+
+    async def start(self, host='0.0.0.0', port=5000):
+        # Loop monitoring doesn't depend on the web server, so it runs even if the port can't be bound
+        self.watchdog.start()
+        self.runner = web.AppRunner(self.app, access_log=None)
+        await self.runner.setup()
+        try:
+            await web.TCPSite(self.runner, host, port).start()
+        except OSError:
+            await self.runner.cleanup()
+            self.runner = None
+            raise
+        logger.info(f"Keep-alive server started on port {port}")
+
+    async def stop(self):
+        self.watchdog.stop()
+        if self.runner:
+            await self.runner.cleanup()
+
+
+async def keep_alive(bot):
+    """Start the health server on the running loop; call stop() on the result at shutdown.
+
+    If the port can't be bound the error is logged and the server is
+    returned without its web endpoints, still watching the loop.
+    """
+    server = HealthServer(bot)
+    try:
+        await server.start(port=int(os.getenv('PORT', 5000)))
+    except OSError as e:
+        logger.error(f"Health server could not start, continuing without it: {e}")
+    return server
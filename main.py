@@ -1,11 +1,20 @@
 import discord
+from discord import app_commands
 from discord.ext import commands
 import asyncio
+import json
 import logging
 import os
+import time
 from dotenv import load_dotenv
-import json
 from pathlib import Path
+from keep_alive import keep_alive
+from utils import storage
+from utils.command_sync import sync_commands
+from utils.database import open_database
+from utils.gateway_trace import TraceRecorder
+from utils.metrics import metrics
+from utils.startup import profile
 
 # Load environment variables
 load_dotenv()
@@ -26,13 +35,56 @@ intents = discord.Intents.default()
 # Only enable message content intent if we have proper permissions
 # intents.message_content = True
 
+COGS = [
+    'cogs.alerts',
+    'cogs.help_system',
+    'cogs.simple_commands',
+    'cogs.documents',
+    'cogs.missions',
+    'cogs.reminders',
+    'cogs.ranks'
+]
+
+def payload_size(data):
+    return len(json.dumps(data, separators=(',', ':')).encode('utf-8')) if data else 0
+
+class InstrumentedTree(app_commands.CommandTree):
+    """Command tree that starts a latency timer for every slash command"""
+
+    async def interaction_check(self, interaction):
+        if interaction.type is discord.InteractionType.application_command:
+            interaction.extras['metrics_started'] = time.perf_counter()
+        return True
+
+    async def on_error(self, interaction, error):
+        record_app_command(interaction, failed=True)
+        await super().on_error(interaction, error)
+
+def record_app_command(interaction, failed=False):
+    started = interaction.extras.pop('metrics_started', None)
+    if started is None or interaction.command is None:
+        return
+    failed = failed or interaction.extras.pop('metrics_failed', False)
+    metrics.observe('slash', interaction.command.qualified_name, time.perf_counter() - started,
+                    error=failed, payload_bytes=payload_size(interaction.data))
+
 class EMSBot(commands.Bot):
     def __init__(self):
+        # Set to record gateway events for benchmarks/replay.py
+        trace_path = os.getenv('GATEWAY_TRACE_PATH')
         super().__init__(
             command_prefix='!',
             intents=intents,
-            help_command=None
+            help_command=None,
+            tree_cls=InstrumentedTree
         )
+        self.trace = TraceRecorder(trace_path) if trace_path else None
+        if self.trace:
+            self.trace.attach(self._connection.parsers)
+        # Extension name -> "loaded" or the load error, for /health
+        self.cog_status = {}
+        self.before_invoke(self.start_command_timer)
+        self.after_invoke(self.record_command)
         
     async def setup_hook(self):
         """Load all cogs when bot starts"""
@@ -40,31 +92,60 @@ class EMSBot(commands.Bot):
             # Ensure data directory exists
             Path('data').mkdir(exist_ok=True)
             
-            # Load cogs
-            cogs = [
-                'cogs.alerts',
-                'cogs.help_system',
-                'cogs.simple_commands',
-                'cogs.documents',
-                'cogs.missions', 
-                'cogs.reminders',
-                'cogs.ranks'
-            ]
+            # With STORAGE_BACKEND=sqlite, open (and on first run import into) the database off the loop before cogs ask for it
+            with profile.timed('bot', 'database open'):
+                await open_database()
             
-            for cog in cogs:
-                try:
-                    await self.load_extension(cog)
-                    logger.info(f"Loaded cog: {cog}")
-                except Exception as e:
-                    logger.error(f"Failed to load cog {cog}: {e}")
+            # Cogs do their blocking data loads in threads from cog_load, so loading them together overlaps that I/O
+            await asyncio.gather(*(self.load_cog(cog) for cog in COGS))
                     
-            # Sync slash commands
-            await self.tree.sync()
-            logger.info("Slash commands synced")
+            # Sync slash commands only when they changed since the last sync
+            with profile.timed('bot', 'tree sync'):
+                await sync_commands(self)
+            
+            profile.finish()
+            logger.info(profile.report())
             
         except Exception as e:
             logger.error(f"Error in setup_hook: {e}")
 
+    async def load_cog(self, cog):
+        try:
+            with profile.timed(cog, 'load'):
+                await self.load_extension(cog)
+            self.cog_status[cog] = "loaded"
+            logger.info(f"Loaded cog: {cog}")
+        except Exception as e:
+            self.cog_status[cog] = f"failed: {e}"
+            logger.error(f"Failed to load cog {cog}: {e}")
+
+    async def start_command_timer(self, ctx):
+        # Hybrid commands run from a slash command are timed by the tree
+        if ctx.interaction is None:
+            ctx.metrics_started = time.perf_counter()
+
+    async def record_command(self, ctx):
+        """Runs after every prefix/hybrid command, whether or not it raised"""
+        if ctx.interaction is not None:
+            # Hybrid errors are handled inside the command, so the tree still reports completion
+            if ctx.command_failed:
+                ctx.interaction.extras['metrics_failed'] = True
+            return
+        started = getattr(ctx, 'metrics_started', None)
+        if started is not None:
+            metrics.observe('prefix', ctx.command.qualified_name, time.perf_counter() - started,
+                            error=ctx.command_failed, payload_bytes=len(ctx.message.content.encode('utf-8')))
+
+    async def on_app_command_completion(self, interaction, command):
+        record_app_command(interaction)
+
+    async def close(self):
+        """Flush pending data writes before shutting down"""
+        await super().close()
+        await storage.flush_all()
+        if self.trace:
+            await self.trace.close()
+
     async def on_ready(self):
         """Called when bot is ready"""
         logger.info(f'{self.user} has connected to Discord!')
@@ -93,11 +174,12 @@ class EMSBot(commands.Bot):
 async def main():
     """Main function to run the bot"""
     bot = EMSBot()
+    health_server = None
     
     try:
-        # Import keep_alive to start Flask server
-        from keep_alive import keep_alive
-        keep_alive()
+        # Health/status web server and loop watchdog, served from this same event loop;
+        # if the port is taken the bot runs without the web server
+        health_server = await keep_alive(bot)
         
         # Start the bot
         token = os.getenv('DISCORD_TOKEN')
@@ -111,6 +193,8 @@ async def main():
         logger.error(f"Error starting bot: {e}")
     finally:
         await bot.close()
+        if health_server:
+            await health_server.stop()
 
 if __name__ == "__main__":
     asyncio.run(main())
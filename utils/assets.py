@@ -0,0 +1,256 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+from pathlib import Path
+
+from utils.search import BM25Index, TOKEN_RE, stem, tokenize
+from utils.storage import write_atomic
+
+logger = logging.getLogger(__name__)
+
+ASSETS_DIR = 'attached_assets'
+INDEX_PATH = 'data/asset_index.json'
+VISIBILITY_PATH = 'data/asset_visibility.json'
+INDEX_VERSION = 1
+
+CHUNK_WORDS = 120
+CHUNK_OVERLAP = 30
+SNIPPET_CHARS = 220
+
+ASSET_FIELD_WEIGHTS = {'title': 3, 'text': 1}
+
+# Assets missing from the visibility map may be tests or answer sheets; keep them from Students until listed
+DEFAULT_VISIBILITY = "Trainer"
+
+
+def asset_title(path):
+    """Readable title from an upload name like 'EMS Phraseology (1)_1752351307610.pdf'"""
+    title = re.sub(r'_\d{10,}$', '', Path(path).stem)
+    title = re.sub(r'\s*\(\d+\)$', '', title)
+    return title.strip() or Path(path).stem
+
+
+def load_visibility_map(path=VISIBILITY_PATH):
+    """Asset title (lowercased) -> the lowest rank allowed to read it"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        logger.warning(f"No asset visibility map at {path}; every asset is {DEFAULT_VISIBILITY}-only")
+        return {}
+    except (OSError, ValueError) as e:
+        logger.error(f"Could not read asset visibility map {path}: {e}")
+        return {}
+    return {title.lower(): visibility for title, visibility in data.items()}
+
+
+def asset_visibility(path, visibility_map):
+    return visibility_map.get(asset_title(path).lower(), DEFAULT_VISIBILITY)
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 16), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def extract_pages(path):
+    """Text of each PDF page, in order"""
+    # Optional, and slow to import, so only loaded when ingesting
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        raise RuntimeError("pypdf is not installed; run `pip install pypdf` to ingest PDFs")
+    reader = PdfReader(path)
+    return [page.extract_text() or '' for page in reader.pages]
+
+
+def chunk_text(text, size=CHUNK_WORDS, overlap=CHUNK_OVERLAP):
+    """Split text into overlapping windows of about `size` words"""
+    words = text.split()
+    if not words:
+        return []
+    step = max(1, size - overlap)
+    return [' '.join(words[start:start + size]) for start in range(0, max(1, len(words) - overlap), step)]
+
+
+def make_snippet(text, query_terms, width=SNIPPET_CHARS):
+    """Window of text around the first word matching a query term"""
+    start = 0
+    for match in TOKEN_RE.finditer(text.lower()):
+        if stem(match.group(0)) in query_terms:
+            start = max(0, match.start() - width // 3)
+            break
+    snippet = text[start:start + width].strip()
+    return ("…" if start else "") + snippet + ("…" if start + width < len(text) else "")
+
+
+class AssetIndex:
+    """Persistent page-level search index over the PDFs in attached_assets.
+
+    Content is keyed by SHA-256, so renamed or duplicate uploads share one
+    set of chunks, and ingestion only extracts files whose bytes changed.
+    Chunk term counts are stored on disk so loading never re-tokenizes.
+    """
+
+    def __init__(self, path=INDEX_PATH):
+        self.path = Path(path)
+        self.files = {}     # relative path -> {'sha256', 'size', 'mtime'}
+        self.contents = {}  # sha256 -> {'title', 'visibility', 'pages', 'chunks': [{'page', 'text', 'terms'}]}
+        self.index = BM25Index(ASSET_FIELD_WEIGHTS)
+
+    def __len__(self):
+        return len(self.index)
+
+    def load(self):
+        if not self.path.exists():
+            return self
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error(f"Could not read asset index {self.path}: {e}")
+            return self
+        if data.get('version') != INDEX_VERSION:
+            logger.warning(f"Ignoring asset index {self.path} with unknown version {data.get('version')}")
+            return self
+        self.files = data.get('files', {})
+        self.contents = data.get('contents', {})
+        self.index = self._build_index(self.contents)
+        logger.info(f"Loaded asset index: {len(self.contents)} files, {len(self.index)} chunks")
+        return self
+
+    def save(self):
+        payload = {'version': INDEX_VERSION, 'files': self.files, 'contents': self.contents}
+        write_atomic(self.path, json.dumps(payload, ensure_ascii=False, separators=(',', ':')))
+
+    @staticmethod
+    def _build_index(contents):
+        index = BM25Index(ASSET_FIELD_WEIGHTS)
+        for sha, content in contents.items():
+            for number, chunk in enumerate(content['chunks']):
+                index.add_terms((sha, number), chunk['terms'])
+        return index
+
+    def ingest(self, assets_dir=ASSETS_DIR, visibility_path=VISIBILITY_PATH):
+        """Bring the index in line with the PDFs on disk; returns counts of what changed"""
+        root = Path(assets_dir)
+        visibility_map = load_visibility_map(visibility_path)
+        stats = {'extracted': 0, 'unchanged': 0, 'removed': 0, 'failed': 0}
+        files, contents = {}, {}
+        for path in sorted(root.rglob('*.pdf')) if root.is_dir() else []:
+            relative = path.relative_to(root).as_posix()
+            stat = path.stat()
+            previous = self.files.get(relative)
+            if previous and previous['size'] == stat.st_size and previous['mtime'] == stat.st_mtime:
+                sha = previous['sha256']
+            else:
+                sha = file_digest(path)
+            files[relative] = {'sha256': sha, 'size': stat.st_size, 'mtime': stat.st_mtime}
+
+            if sha in contents:
+                continue
+            if sha in self.contents:
+                # Re-read visibility so edits to the map apply without re-extracting
+                contents[sha] = {**self.contents[sha], 'visibility': asset_visibility(path, visibility_map)}
+                stats['unchanged'] += 1
+                continue
+            try:
+                pages = extract_pages(path)
+            except Exception as e:
+                logger.error(f"Could not extract {relative}: {e}")
+                del files[relative]
+                stats['failed'] += 1
+                continue
+            title = asset_title(path)
+            chunks = []
+            for page_number, text in enumerate(pages, 1):
+                for chunk in chunk_text(text):
+                    terms = dict(self.index.term_counts({'title': title, 'text': chunk}))
+                    chunks.append({'page': page_number, 'text': chunk, 'terms': terms})
+            contents[sha] = {'title': title, 'visibility': asset_visibility(path, visibility_map), 'pages': len(pages), 'chunks': chunks}
+            stats['extracted'] += 1
+
+        stats['removed'] = len(set(self.contents) - set(contents))
+        index = self._build_index(contents)
+        self.files, self.contents, self.index = files, contents, index
+        return stats
+
+    def search(self, query, limit=3, allowed=None):
+        """Best page-level hits, at most one per page, optionally filtered by `allowed(visibility)`"""
+        contents = self.contents
+
+        def accept(key):
+            content = contents.get(key[0])
+            return content is not None and (allowed is None or allowed(content['visibility']))
+
+        query_terms = set(tokenize(query))
+        hits, seen_pages = [], set()
+        for score, (sha, number) in self.index.search(query, limit * 4, accept):
+            content = contents[sha]
+            chunk = content['chunks'][number]
+            if (sha, chunk['page']) in seen_pages:
+                continue
+            seen_pages.add((sha, chunk['page']))
+            hits.append({
+                'score': score,
+                'title': content['title'],
+                'page': chunk['page'],
+                'pages': content['pages'],
+                'visibility': content['visibility'],
+                'snippet': make_snippet(chunk['text'], query_terms)
+            })
+            if len(hits) == limit:
+                break
+        return hits
+
+
+def format_hits(hits, limit=1000):
+    """Embed field text listing page hits with their snippets"""
+    lines = [f"**{hit['title']}** — page {hit['page']}/{hit['pages']}\n└ {hit['snippet']}" for hit in hits]
+    text = '\n'.join(lines)
+    return text[:limit - 3] + "..." if len(text) > limit else text
+
+
+_asset_index = None
+
+
+def get_asset_index():
+    """Shared AssetIndex, loaded from disk on first use"""
+    global _asset_index
+    if _asset_index is None:
+        _asset_index = AssetIndex(os.getenv('ASSET_INDEX_PATH', INDEX_PATH)).load()
+    return _asset_index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EMS training material indexer")
+    subcommands = parser.add_subparsers(dest='command', required=True)
+    ingest = subcommands.add_parser('ingest', help="Extract and index new or changed PDFs")
+    ingest.add_argument('--assets-dir', default=ASSETS_DIR)
+    ingest.add_argument('--visibility', default=VISIBILITY_PATH, help="JSON map of asset title to visibility")
+    ingest.add_argument('--index', default=os.getenv('ASSET_INDEX_PATH', INDEX_PATH))
+    search = subcommands.add_parser('search', help="Query the index")
+    search.add_argument('query')
+    search.add_argument('--index', default=os.getenv('ASSET_INDEX_PATH', INDEX_PATH))
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s - %(message)s')
+    logging.getLogger('pypdf').setLevel(logging.ERROR)
+    index = AssetIndex(args.index).load()
+    if args.command == 'ingest':
+        stats = index.ingest(args.assets_dir, args.visibility)
+        index.save()
+        print(', '.join(f"{name}: {count}" for name, count in stats.items()))
+    elif args.command == 'search':
+        for hit in index.search(args.query, 5):
+            print(f"{hit['score']:.2f}  {hit['title']} p.{hit['page']}  {hit['snippet']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """Bounded mapping whose entries expire `ttl` seconds after they were last set.
+
+    Entries are kept in expiry order, so expired ones are trimmed from the
+    front and the oldest entry is evicted when `maxsize` is exceeded.
+    """
+
+    def __init__(self, maxsize, ttl, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self._data = OrderedDict()
+
+    def __len__(self):
+        self._expire()
+        return len(self._data)
+
+    def get(self, key, default=None):
+        item = self._data.get(key)
+        if item is None:
+            return default
+        expires, value = item
+        if expires <= self.clock():
+            del self._data[key]
+            return default
+        return value
+
+    def set(self, key, value):
+        """Store a value and restart its expiry window"""
+        self._data.pop(key, None)
+        self._data[key] = (self.clock() + self.ttl, value)
+        self._expire()
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        item = self._data.pop(key, None)
+        return default if item is None else item[1]
+
+    def _expire(self):
+        now = self.clock()
+        while self._data:
+            key, (expires, _) = next(iter(self._data.items()))
+            if expires > now:
+                break
+            del self._data[key]
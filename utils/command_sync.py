@@ -0,0 +1,59 @@
+import hashlib
+import json
+import logging
+import os
+
+import discord
+
+from utils.storage import JSONStore
+
+logger = logging.getLogger(__name__)
+
+SYNC_STATE_PATH = 'data/command_sync.json'
+
+
+def tree_digest(tree, guild=None):
+    """Stable hash of the command payload Discord would receive for a scope"""
+    payload = [command.to_dict(tree) for command in tree.get_commands(guild=guild)]
+    payload.sort(key=lambda command: (command.get('type', 1), command['name']))
+    encoded = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+async def sync_commands(bot):
+    """Sync application commands only when the tree differs from the last sync.
+
+    With DEV_GUILD_ID set, global commands are copied to that guild and
+    synced there only (guild syncs apply instantly); otherwise the global
+    tree is synced. FORCE_COMMAND_SYNC=1 syncs regardless of the hash.
+    Returns True if the commands were synced. A failed sync (HTTP error,
+    rate limit) is logged and not recorded, so the next start retries it;
+    the bot runs on with the commands Discord already has.
+    """
+    store = JSONStore(SYNC_STATE_PATH)
+    hashes = store.load()
+
+    guild = None
+    dev_guild_id = os.getenv('DEV_GUILD_ID')
+    if dev_guild_id:
+        guild = discord.Object(id=int(dev_guild_id))
+        bot.tree.copy_global_to(guild=guild)
+
+    scope = f"{bot.application_id}:{dev_guild_id or 'global'}"
+    digest = tree_digest(bot.tree, guild)
+    force = os.getenv('FORCE_COMMAND_SYNC', '').lower() in ('1', 'true', 'yes')
+    if not force and hashes.get(scope) == digest:
+        logger.info(f"Slash commands unchanged ({scope}), skipping sync")
+        return False
+
+    try:
+        synced = await bot.tree.sync(guild=guild)
+    except Exception as e:
+        logger.error(f"Slash command sync failed ({scope}), keeping the previously synced commands: {e}")
+        return False
+    hashes[scope] = digest
+    store.save(lambda: hashes)
+    # Persist now, so a crash loop right after this doesn't sync again
+    await store.flush()
+    logger.info(f"Synced {len(synced)} slash commands ({scope})")
+    return True
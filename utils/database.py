@@ -0,0 +1,287 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from utils.documents import NEXT_ID_KEY, unpack_documents
+from utils.storage import EventLog
+
+logger = logging.getLogger(__name__)
+
+# Columns pulled out of each record so they can be indexed; the full record
+# is kept as JSON in the `data` column so cogs can add fields freely.
+TABLES = {
+    'missions': ('id', 'user_id', 'user_name', 'start_time', 'end_time', 'success'),
+    'reminders': ('id', 'reminder_time', 'active'),
+    'documents': ('id', 'name', 'category', 'visibility'),
+    'users': ('user_id',),
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS missions (
+    id INTEGER PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    user_name TEXT,
+    start_time TEXT NOT NULL,
+    end_time TEXT,
+    success TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_missions_user_start ON missions(user_id, start_time);
+CREATE INDEX IF NOT EXISTS idx_missions_start ON missions(start_time);
+CREATE INDEX IF NOT EXISTS idx_missions_active ON missions(user_id) WHERE end_time IS NULL;
+
+CREATE TABLE IF NOT EXISTS reminders (
+    id INTEGER PRIMARY KEY,
+    reminder_time TEXT NOT NULL,
+    active INTEGER NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_reminders_due ON reminders(reminder_time) WHERE active = 1;
+
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    category TEXT,
+    visibility TEXT,
+    data TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_documents_name ON documents(name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_documents_category ON documents(category);
+
+CREATE TABLE IF NOT EXISTS users (
+    user_id TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class Database:
+    """SQLite (WAL) store for missions, reminders, documents and users.
+
+    Calls made from the event loop go through a single worker thread, so
+    writes keep their order and never block the gateway. The plain
+    (non-async) methods are for startup loads and the migration CLI.
+    """
+
+    def __init__(self, path='data/ems.db'):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='ems-db')
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+
+    def query(self, sql, params=()):
+        """Run a read query and return all rows"""
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def records(self, table, where='', params=()):
+        """Return decoded records from a table, optionally filtered/ordered by a SQL tail"""
+        rows = self.query(f"SELECT data FROM {table} {where}", params)
+        return [json.loads(row['data']) for row in rows]
+
+    def write(self, table, records=(), deleted=()):
+        """Upsert records and delete keys from a table in a single transaction"""
+        with self._lock, self._conn:
+            self._write(table, records, deleted)
+
+    @contextmanager
+    def transaction(self):
+        """Commit everything written inside the block together, or none of it on error.
+
+        Inside the block write with _write/_set_meta; the public methods would
+        wait on the lock this holds.
+        """
+        with self._lock, self._conn:
+            yield
+
+    def _write(self, table, records, deleted):
+        columns = TABLES[table]
+        key = columns[0]
+        if table == 'users':
+            rows = [(user_id, json.dumps(data)) for user_id, data in records]
+        else:
+            rows = [tuple(self._column(record, column) for column in columns) + (json.dumps(record),)
+                    for record in records]
+        names = ', '.join(columns + ('data',))
+        placeholders = ', '.join('?' * (len(columns) + 1))
+        updates = ', '.join(f"{column} = excluded.{column}" for column in columns[1:] + ('data',))
+        if rows:
+            self._conn.executemany(
+                f"INSERT INTO {table} ({names}) VALUES ({placeholders}) "
+                f"ON CONFLICT({key}) DO UPDATE SET {updates}",
+                rows
+            )
+        if deleted:
+            self._conn.executemany(f"DELETE FROM {table} WHERE {key} = ?", [(k,) for k in deleted])
+
+    @staticmethod
+    def _column(record, column):
+        value = record.get(column)
+        if column == 'active':
+            return int(value if value is not None else True)
+        return value
+
+    def get_meta(self, key, default=None):
+        rows = self.query("SELECT value FROM meta WHERE key = ?", (key,))
+        return rows[0]['value'] if rows else default
+
+    def set_meta(self, key, value):
+        with self._lock, self._conn:
+            self._set_meta(key, value)
+
+    def _set_meta(self, key, value):
+        self._conn.execute(
+            "INSERT INTO meta (key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, str(value))
+        )
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    async def fetch(self, sql, params=()):
+        return await self._run(self.query, sql, params)
+
+    async def fetch_records(self, table, where='', params=()):
+        return await self._run(self.records, table, where, params)
+
+    async def commit(self, table, records=(), deleted=()):
+        """Write in one transaction, raising on failure so the caller can undo its in-memory change"""
+        await self._run(self.write, table, list(records), list(deleted))
+
+    async def save(self, table, records=(), deleted=()):
+        try:
+            await self.commit(table, records, deleted)
+        except Exception as e:
+            logger.error(f"Error writing {table} to {self.path}: {e}")
+
+    async def save_meta(self, key, value):
+        try:
+            await self._run(self.set_meta, key, value)
+        except Exception as e:
+            logger.error(f"Error writing {key} to {self.path}: {e}")
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            self._conn.close()
+
+
+def migrate_json(db, data_dir='data'):
+    """Copy the JSON data files into the database; safe to run more than once.
+
+    Everything, the migrated_from marker included, is written in one
+    transaction, so a failed import leaves the database as it was and the
+    next start tries again from scratch.
+    """
+    data_dir = Path(data_dir)
+    counts = {}
+
+    def read(name, default, types=None):
+        path = data_dir / name
+        if not path.exists():
+            return default
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return data if isinstance(data, types or type(default)) else default
+
+    missions = read('missions.json', {}).get('missions', {})
+    # Fold in mission events logged since the last snapshot
+    for event in EventLog(data_dir / 'missions.events.jsonl').replay():
+        if event.get('event') == 'start':
+            missions[str(event['mission']['id'])] = event['mission']
+        elif str(event.get('id')) in missions:
+            fields = {key: value for key, value in event.items() if key in ('end_time', 'success', 'notes')}
+            missions[str(event['id'])].update(fields)
+    counts['missions'] = len(missions)
+    reminders = read('reminders.json', {})
+    counts['reminders'] = len(reminders)
+    documents, next_id = unpack_documents(read('documents.json', [], (list, dict)))
+    # Never move the allocator backwards when the import is re-run
+    next_id = max(next_id, int(db.get_meta(NEXT_ID_KEY, 1)))
+    counts['documents'] = len(documents)
+    users = read('users.json', {})
+    counts['users'] = len(users)
+
+    with db.transaction():
+        db._write('missions', missions.values(), ())
+        db._write('reminders', reminders.values(), ())
+        db._write('documents', documents, ())
+        db._set_meta(NEXT_ID_KEY, next_id)
+        db._write('users', users.items(), ())
+        db._set_meta('migrated_from', str(data_dir))
+    logger.info(f"Migrated JSON data into {db.path}: {counts}")
+    return counts
+
+
+_database = None
+
+
+def sqlite_enabled():
+    return os.getenv('STORAGE_BACKEND', 'json').lower() == 'sqlite'
+
+
+def connect_database():
+    """Open the shared Database when STORAGE_BACKEND=sqlite, importing the JSON files on first use.
+
+    Blocking: the bot calls it through open_database(); CLI tools call it directly.
+    """
+    global _database
+    if not sqlite_enabled():
+        return None
+    if _database is None:
+        db = Database(os.getenv('DATABASE_PATH', 'data/ems.db'))
+        if db.get_meta('migrated_from') is None:
+            migrate_json(db)
+        _database = db
+    return _database
+
+
+async def open_database():
+    """connect_database() in a worker thread, so parsing the JSON files never stalls the event loop"""
+    return await asyncio.to_thread(connect_database)
+
+
+def get_database():
+    """Shared Database when STORAGE_BACKEND=sqlite, otherwise None; open_database() must have run"""
+    if sqlite_enabled() and _database is None:
+        raise RuntimeError("STORAGE_BACKEND=sqlite but the database was not opened; await open_database() first")
+    return _database
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EMS bot SQLite storage tools")
+    subcommands = parser.add_subparsers(dest='command', required=True)
+    migrate = subcommands.add_parser('migrate', help="Import data/*.json into the database")
+    migrate.add_argument('--data-dir', default='data')
+    migrate.add_argument('--db', default=os.getenv('DATABASE_PATH', 'data/ems.db'))
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s - %(message)s')
+    if args.command == 'migrate':
+        db = Database(args.db)
+        counts = migrate_json(db, args.data_dir)
+        db.close()
+        print(', '.join(f"{table}: {count}" for table, count in counts.items()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,397 @@
+import argparse
+import csv
+import heapq
+import io
+import json
+import logging
+import sys
+from bisect import bisect_left, insort
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from utils.search import tokenize
+
+logger = logging.getLogger(__name__)
+
+VISIBILITIES = ('Student', 'Trainer', 'Command')
+# Columns of an export, in order; an import reads the same columns (ids are reassigned)
+EXPORT_FIELDS = ('id', 'name', 'description', 'visibility', 'category', 'url', 'uploaded_by', 'uploaded_at')
+FORMATS = ('csv', 'jsonl')
+# Meta key holding the id allocator on the SQLite backend
+NEXT_ID_KEY = 'documents_next_id'
+# Autocomplete choices are cut at 100 characters, so longer names could never be picked
+MAX_NAME_LENGTH = 100
+MAX_DESCRIPTION_LENGTH = 1000
+
+
+class ManifestError(ValueError):
+    """A manifest that can't be imported; `problems` lists what is wrong, by line"""
+
+    def __init__(self, problems):
+        super().__init__(f"{len(problems)} problem(s) in manifest")
+        self.problems = problems
+
+
+def manifest_format(filename):
+    """csv or jsonl, from the file extension"""
+    suffix = Path(filename).suffix.lower()
+    if suffix == '.csv':
+        return 'csv'
+    if suffix in ('.jsonl', '.ndjson', '.json'):
+        return 'jsonl'
+    raise ManifestError([f"{filename}: expected a .csv or .jsonl manifest"])
+
+
+def read_manifest(text, fmt):
+    """Yield (line number, row dict) from CSV (with a header row) or JSON-lines text"""
+    if fmt == 'csv':
+        reader = csv.DictReader(io.StringIO(text))
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line_number, line in enumerate(text.splitlines(), 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            row = e
+        yield line_number, row
+
+
+def _text(row, field):
+    value = row.get(field)
+    return str(value).strip() if value is not None else ''
+
+
+def document_problems(name, description, visibility, url):
+    """What is wrong with one document's fields, for manifest rows and /upload_doc alike"""
+    problems = []
+    if not name:
+        problems.append("name is required")
+    elif len(name) > MAX_NAME_LENGTH:
+        problems.append(f"name is longer than {MAX_NAME_LENGTH} characters")
+    if not description:
+        problems.append("description is required")
+    elif len(description) > MAX_DESCRIPTION_LENGTH:
+        problems.append(f"description is longer than {MAX_DESCRIPTION_LENGTH} characters")
+    if visibility not in VISIBILITIES:
+        problems.append(f"visibility must be one of {', '.join(VISIBILITIES)}")
+    if url and not url.startswith(('http://', 'https://')):
+        problems.append("url must start with http:// or https://")
+    return problems
+
+
+def validate_manifest(rows, existing_names, skip_existing=False, uploaded_by='import'):
+    """Turn manifest rows into new document records, without ids.
+
+    Every row is checked before anything is returned: a manifest with any
+    problem raises ManifestError listing all of them, so an import is all or
+    nothing. Names are unique case-insensitively, within the manifest and
+    against `existing_names` (lowercased); with skip_existing, rows naming an
+    existing document are skipped instead. Returns (documents, skipped names).
+    """
+    documents, skipped, problems = [], [], []
+    seen = {}
+    now = datetime.utcnow().isoformat()
+    for line_number, row in rows:
+        if not isinstance(row, dict):
+            problems.append(f"line {line_number}: not a JSON object" if not isinstance(row, Exception)
+                            else f"line {line_number}: invalid JSON ({row.msg})")
+            continue
+        name = _text(row, 'name')
+        description = _text(row, 'description')
+        visibility = _text(row, 'visibility').capitalize()
+        url = _text(row, 'url') or None
+        row_problems = document_problems(name, description, visibility, url)
+        key = name.lower()
+        if key in seen:
+            row_problems.append(f"same name as line {seen[key]}")
+        elif key in existing_names:
+            if skip_existing:
+                seen[key] = line_number
+                skipped.append(name)
+                continue
+            row_problems.append(f"a document named '{name}' already exists")
+        if row_problems:
+            problems.append(f"line {line_number}: {'; '.join(row_problems)}")
+            continue
+        seen[key] = line_number
+        documents.append({
+            'name': name,
+            'description': description,
+            'visibility': visibility,
+            'category': _text(row, 'category') or 'General',
+            'url': url,
+            'uploaded_by': _text(row, 'uploaded_by') or uploaded_by,
+            'uploaded_at': _text(row, 'uploaded_at') or now,
+            'file_path': None
+        })
+    if problems:
+        raise ManifestError(problems)
+    return documents, skipped
+
+
+def unpack_documents(data):
+    """(documents, next id) from documents.json: {"next_id", "documents"}, or the older bare list.
+
+    Ids are never reused, so a removed document's id can't be handed to a
+    new one; the allocator is also kept past the highest id on file in
+    case it was saved behind its documents. Files written by the old
+    len(documents) + 1 allocator can repeat an id; every document after the
+    first holding an id gets a fresh one, so none is overwritten when keyed
+    by id.
+    """
+    if isinstance(data, list):
+        documents, next_id = data, 1
+    else:
+        documents, next_id = data.get('documents', []), int(data.get('next_id', 1))
+    next_id = max(next_id, max((doc['id'] for doc in documents), default=0) + 1)
+    seen = set()
+    for doc in documents:
+        if doc['id'] in seen:
+            logger.warning(f"Document '{doc.get('name')}' shares id {doc['id']} with another document; reassigned id {next_id}")
+            doc['id'] = next_id
+            next_id += 1
+        seen.add(doc['id'])
+    return documents, next_id
+
+
+def pack_documents(documents, next_id):
+    return {'next_id': next_id, 'documents': documents}
+
+
+def assign_ids(documents, next_id):
+    """Number new documents from next_id on; returns the next free id"""
+    for doc in documents:
+        doc['id'] = next_id
+        next_id += 1
+    return next_id
+
+
+class _TermIndex:
+    """Term -> ids postings with a sorted vocabulary, so a prefix finds every term it starts"""
+
+    __slots__ = ('postings', 'vocabulary')
+
+    def __init__(self):
+        self.postings = {}
+        self.vocabulary = []
+
+    def add(self, doc_id, terms):
+        for term in terms:
+            if term not in self.postings:
+                self.postings[term] = set()
+                insort(self.vocabulary, term)
+            self.postings[term].add(doc_id)
+
+    def remove(self, doc_id, terms):
+        for term in terms:
+            ids = self.postings[term]
+            ids.discard(doc_id)
+            if not ids:
+                del self.postings[term]
+                del self.vocabulary[bisect_left(self.vocabulary, term)]
+
+    def matching(self, prefix):
+        """Ids with a term starting with prefix"""
+        ids = set()
+        for position in range(bisect_left(self.vocabulary, prefix), len(self.vocabulary)):
+            term = self.vocabulary[position]
+            if not term.startswith(prefix):
+                break
+            ids |= self.postings[term]
+        return ids
+
+    def matching_all(self, terms, within=None):
+        """Ids matching every term (as a prefix), optionally only among `within`"""
+        ids = within
+        # Longest terms first: they tend to be the most selective
+        for term in sorted(terms, key=len, reverse=True):
+            ids = self.matching(term) if ids is None else ids & self.matching(term)
+            if not ids:
+                return set()
+        return ids
+
+
+class _Partition:
+    """Documents of one visibility level, indexed by category and by search term"""
+
+    __slots__ = ('docs', 'categories', 'text', 'names')
+
+    def __init__(self):
+        self.docs = {}        # id -> document, in insertion (id) order
+        self.categories = {}  # category -> set of ids
+        self.text = _TermIndex()   # name and description terms
+        self.names = _TermIndex()  # name terms alone, to rank name matches first
+
+    @staticmethod
+    def terms(doc):
+        name_terms = set(tokenize(doc['name']))
+        return name_terms | set(tokenize(doc.get('description', ''))), name_terms
+
+    def add(self, doc):
+        doc_id = doc['id']
+        self.docs[doc_id] = doc
+        self.categories.setdefault(doc.get('category', 'General'), set()).add(doc_id)
+        text_terms, name_terms = self.terms(doc)
+        self.text.add(doc_id, text_terms)
+        self.names.add(doc_id, name_terms)
+
+    def remove(self, doc):
+        doc_id = doc['id']
+        if self.docs.pop(doc_id, None) is None:
+            return
+        category = doc.get('category', 'General')
+        self.categories[category].discard(doc_id)
+        if not self.categories[category]:
+            del self.categories[category]
+        text_terms, name_terms = self.terms(doc)
+        self.text.remove(doc_id, text_terms)
+        self.names.remove(doc_id, name_terms)
+
+
+class DocumentCatalog:
+    """Documents split by visibility level, each level with its own indexes.
+
+    Lookups for a rank only visit the partitions at or below its level, so
+    a Student search never touches Trainer or Command documents. Names and
+    descriptions are indexed as search terms (utils.search.tokenize); each
+    query term matches the terms it is a prefix of, and all must match.
+    """
+
+    def __init__(self, levels):
+        self.levels = levels  # visibility -> level
+        self.default_level = min(levels.values())
+        self.partitions = {level: _Partition() for level in sorted(set(levels.values()))}
+
+    def __len__(self):
+        return sum(len(partition.docs) for partition in self.partitions.values())
+
+    def level(self, doc):
+        return self.levels.get(doc.get('visibility', 'Student'), self.default_level)
+
+    def add(self, doc):
+        self.partitions[self.level(doc)].add(doc)
+
+    def remove(self, doc):
+        self.partitions[self.level(doc)].remove(doc)
+
+    def visible(self, level):
+        return [partition for partition_level, partition in self.partitions.items() if partition_level <= level]
+
+    def count(self, level):
+        return sum(len(partition.docs) for partition in self.visible(level))
+
+    def listing(self, level):
+        """Every document visible at level, by id, produced lazily so a page only reads its own slice"""
+        return heapq.merge(*(partition.docs.values() for partition in self.visible(level)), key=lambda doc: doc['id'])
+
+    def search(self, query, level):
+        """Documents visible at level matching every query term; name matches first, then by id"""
+        terms = set(tokenize(query))
+        if not terms:
+            # Nothing indexable (e.g. only stopwords): fall back to a plain substring match
+            needle = query.lower()
+            return [doc for doc in self.listing(level)
+                    if needle in doc['name'].lower() or needle in doc.get('description', '').lower()]
+        in_name, elsewhere = [], []
+        for partition in self.visible(level):
+            ids = partition.text.matching_all(terms)
+            if not ids:
+                continue
+            named = partition.names.matching_all(terms, ids)
+            in_name.extend(partition.docs[doc_id] for doc_id in named)
+            elsewhere.extend(partition.docs[doc_id] for doc_id in ids - named)
+        in_name.sort(key=lambda doc: doc['id'])
+        elsewhere.sort(key=lambda doc: doc['id'])
+        return in_name + elsewhere
+
+    def category_counts(self):
+        counts = Counter()
+        for partition in self.partitions.values():
+            for category, ids in partition.categories.items():
+                counts[category] += len(ids)
+        return counts
+
+
+def export_lines(documents, fmt):
+    """Yield the export one line at a time, so large libraries never build one big string"""
+    if fmt == 'csv':
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, EXPORT_FIELDS, extrasaction='ignore', lineterminator='\n')
+        writer.writeheader()
+        for doc in documents:
+            writer.writerow({field: doc.get(field) for field in EXPORT_FIELDS})
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
+        return
+    for doc in documents:
+        yield json.dumps({field: doc.get(field) for field in EXPORT_FIELDS}, ensure_ascii=False) + '\n'
+
+
+def _open_documents(data_dir):
+    """Current documents, the next free id and a function storing (all documents, added, next id)"""
+    from utils.database import connect_database
+    from utils.storage import JSONStore
+    db = connect_database()
+    if db:
+        documents, next_id = unpack_documents({'next_id': db.get_meta(NEXT_ID_KEY, 1),
+                                               'documents': db.records('documents', "ORDER BY id")})
+
+        def store(documents, added, next_id):
+            db.write('documents', added)
+            db.set_meta(NEXT_ID_KEY, next_id)
+        return documents, next_id, store
+    store = JSONStore(Path(data_dir) / 'documents.json', default=lambda: pack_documents([], 1))
+    documents, next_id = unpack_documents(store.load())
+    # No event loop here, so save() writes straight through (atomically)
+    return documents, next_id, lambda documents, added, next_id: store.save(lambda: pack_documents(documents, next_id))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import and export of EMS training documents")
+    subcommands = parser.add_subparsers(dest='command', required=True)
+    load = subcommands.add_parser('import', help="Add every document in a CSV or JSON-lines manifest, in one write")
+    load.add_argument('manifest')
+    load.add_argument('--skip-existing', action='store_true', help="Skip rows whose name already exists instead of failing")
+    load.add_argument('--dry-run', action='store_true', help="Validate only")
+    load.add_argument('--data-dir', default='data')
+    dump = subcommands.add_parser('export', help="Write every document as CSV or JSON lines")
+    dump.add_argument('--format', choices=FORMATS, default='csv')
+    dump.add_argument('--output', help="File to write (default: stdout)")
+    dump.add_argument('--data-dir', default='data')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s - %(message)s')
+    # The bot keeps documents in memory; stop it first or it will write its own copy back
+    existing, next_id, store = _open_documents(args.data_dir)
+    if args.command == 'import':
+        try:
+            with open(args.manifest, 'r', encoding='utf-8-sig', newline='') as f:
+                rows = read_manifest(f.read(), manifest_format(args.manifest))
+            names = {doc['name'].lower() for doc in existing}
+            added, skipped = validate_manifest(rows, names, args.skip_existing)
+        except ManifestError as e:
+            print('\n'.join(e.problems), file=sys.stderr)
+            return 1
+        if not args.dry_run:
+            next_id = assign_ids(added, next_id)
+            store(existing + added, added, next_id)
+        print(f"{'Would import' if args.dry_run else 'Imported'} {len(added)} document(s), skipped {len(skipped)} existing")
+    elif args.command == 'export':
+        output = open(args.output, 'w', encoding='utf-8', newline='') if args.output else sys.stdout
+        try:
+            for line in export_lines(existing, args.format):
+                output.write(line)
+        finally:
+            if args.output:
+                output.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,48 @@
+import copy
+import logging
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+
+class EmbedCache:
+    """Embeds built once and reused until their source data changes.
+
+    Builders are registered by key; warm() builds everything up front and
+    invalidate() drops entries so the next get() rebuilds them. Cached
+    embeds are shared between calls; use copy(key) to get one that can
+    take per-call fields.
+    """
+
+    def __init__(self):
+        self._builders = {}
+        self._embeds = {}
+
+    def register(self, key, builder):
+        self._builders[key] = builder
+        self._embeds.pop(key, None)
+
+    def get(self, key):
+        embed = self._embeds.get(key)
+        if embed is None:
+            embed = self._embeds[key] = self._builders[key]()
+        return embed
+
+    def copy(self, key):
+        # Embed.copy() is shallow and would share the cached field list
+        return discord.Embed.from_dict(copy.deepcopy(self.get(key).to_dict()))
+
+    def invalidate(self, *keys):
+        """Forget the given embeds, or all of them when no keys are given"""
+        if not keys:
+            self._embeds.clear()
+        for key in keys:
+            self._embeds.pop(key, None)
+
+    def warm(self):
+        for key in self._builders:
+            try:
+                self.get(key)
+            except Exception as e:
+                logger.error(f"Error building {key} embed: {e}")
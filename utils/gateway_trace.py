@@ -0,0 +1,56 @@
+import json
+import logging
+import time
+
+from utils.storage import EventLog
+
+logger = logging.getLogger(__name__)
+
+
+class TraceRecorder:
+    """Appends gateway dispatch events to a JSON-lines file for offline replay.
+
+    Each line is {"at": seconds since the first event, "t": event name,
+    "d": payload}. Payloads are taken after discord.py has decoded them and
+    written in batches by an EventLog, so recording costs the loop one dump
+    per event. Traces hold message content and user ids, so treat them like
+    the bot's logs.
+    """
+
+    def __init__(self, path, delay=1.0):
+        self.path = path
+        self.log = EventLog(path, delay=delay)
+        self.started = None
+        self.events = 0
+        logger.warning(f"Recording gateway events to {path}")
+
+    def attach(self, parsers):
+        """Wrap a ConnectionState's parsers so every dispatch event is recorded before it is handled"""
+        for event, parser in list(parsers.items()):
+            parsers[event] = self._recording(event, parser)
+
+    def _recording(self, event, parser):
+        def parse(data):
+            self.record(event, data)
+            parser(data)
+        return parse
+
+    def record(self, event, data):
+        now = time.monotonic()
+        if self.started is None:
+            self.started = now
+        # Dumped now, before the parser can change the payload
+        self.log.append({'at': round(now - self.started, 4), 't': event, 'd': data})
+        self.events += 1
+
+    async def close(self):
+        await self.log.flush()
+
+
+def read_trace(path):
+    """Yield (at, event name, payload) from a trace file; lines without "at" get None"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                event = json.loads(line)
+                yield event.get('at'), event['t'], event['d']
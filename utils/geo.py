@@ -0,0 +1,137 @@
+import csv
+import heapq
+import logging
+import math
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_NM = 3440.065
+
+
+def to_unit_vector(lat, lon):
+    """Point on the unit sphere; straight-line order here matches great-circle order"""
+    lat, lon = math.radians(lat), math.radians(lon)
+    return (math.cos(lat) * math.cos(lon), math.cos(lat) * math.sin(lon), math.sin(lat))
+
+
+def great_circle_nm(lat1, lon1, lat2, lon2):
+    """Haversine distance in nautical miles"""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_NM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class KDTree:
+    """Static 3-d tree over points, stored as flat arrays for a compact build"""
+
+    def __init__(self, points):
+        self.points = points
+        count = len(points)
+        self.index = list(range(count))
+        self.axis = [0] * count
+        self.left = [-1] * count
+        self.right = [-1] * count
+        self.root = self._build(0, count, 0)
+
+    def _build(self, start, end, depth):
+        # Iterative with an explicit stack to avoid recursion limits on big datasets
+        if start >= end:
+            return -1
+        root = None
+        stack = [(start, end, depth, None, None)]
+        while stack:
+            lo, hi, d, parent, side = stack.pop()
+            if lo >= hi:
+                continue
+            axis = d % 3
+            chunk = sorted(self.index[lo:hi], key=lambda i: self.points[i][axis])
+            self.index[lo:hi] = chunk
+            mid = (lo + hi) // 2
+            node = self.index[mid]
+            self.axis[node] = axis
+            if parent is None:
+                root = node
+            elif side == 'left':
+                self.left[parent] = node
+            else:
+                self.right[parent] = node
+            stack.append((lo, mid, d + 1, node, 'left'))
+            stack.append((mid + 1, hi, d + 1, node, 'right'))
+        return root
+
+    def nearest(self, target, k):
+        """Indices of the k points closest to target, nearest first"""
+        points, axes, left, right = self.points, self.axis, self.left, self.right
+        tx, ty, tz = target
+        best = []  # max-heap of (-distance², index)
+        worst = float('inf')
+        # (node, squared distance from target to the plane that led here)
+        stack = [(self.root, 0.0)] if self.root != -1 else []
+        while stack:
+            node, plane2 = stack.pop()
+            # Our matches may have improved since this branch was queued
+            if plane2 >= worst:
+                continue
+            x, y, z = points[node]
+            dist2 = (x - tx) ** 2 + (y - ty) ** 2 + (z - tz) ** 2
+            if len(best) < k:
+                heapq.heappush(best, (-dist2, node))
+                if len(best) == k:
+                    worst = -best[0][0]
+            elif dist2 < worst:
+                heapq.heapreplace(best, (-dist2, node))
+                worst = -best[0][0]
+
+            diff = target[axes[node]] - points[node][axes[node]]
+            near, far = (left[node], right[node]) if diff < 0 else (right[node], left[node])
+            if far != -1 and diff * diff < worst:
+                stack.append((far, diff * diff))
+            if near != -1:
+                stack.append((near, 0.0))
+        return [node for _, node in sorted(best, key=lambda item: -item[0])]
+
+
+class AirportIndex:
+    """Nearest-airport lookup over OurAirports-format airports.csv/runways.csv"""
+
+    def __init__(self, airports=None):
+        self.airports = airports or []
+        self.tree = KDTree([to_unit_vector(a['lat'], a['lon']) for a in self.airports])
+
+    @classmethod
+    def load(cls, airports_csv='data/airports.csv', runways_csv='data/runways.csv'):
+        runways = {}
+        if Path(runways_csv).exists():
+            with open(runways_csv, 'r', encoding='utf-8', newline='') as f:
+                for row in csv.DictReader(f):
+                    if not row.get('length_ft'):
+                        continue
+                    name = '/'.join(end for end in (row.get('le_ident'), row.get('he_ident')) if end) or 'Unnamed'
+                    runways.setdefault(row['airport_ident'], []).append((name, int(float(row['length_ft']))))
+
+        airports = []
+        if Path(airports_csv).exists():
+            with open(airports_csv, 'r', encoding='utf-8', newline='') as f:
+                for row in csv.DictReader(f):
+                    try:
+                        airports.append({
+                            'ident': row['ident'],
+                            'name': row['name'],
+                            'lat': float(row['latitude_deg']),
+                            'lon': float(row['longitude_deg']),
+                            'runways': sorted(runways.get(row['ident'], []), key=lambda r: -r[1])
+                        })
+                    except (KeyError, ValueError):
+                        continue
+        else:
+            logger.warning(f"Airport dataset {airports_csv} not found; nearest airport lookup disabled")
+        return cls(airports)
+
+    def nearest(self, lat, lon, limit=3):
+        """Closest airports to a position as (airport, distance in NM) pairs"""
+        if not self.airports:
+            return []
+        indices = self.tree.nearest(to_unit_vector(lat, lon), limit)
+        return [(self.airports[i], great_circle_nm(lat, lon, self.airports[i]['lat'], self.airports[i]['lon']))
+                for i in indices]
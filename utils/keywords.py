@@ -0,0 +1,40 @@
+import re
+
+
+class KeywordMatcher:
+    """Finds whole-word keyword matches with one compiled regex.
+
+    Keywords are deduplicated case-insensitively. Every keyword that occurs
+    is reported, including ones nested in a longer match: "emergency
+    landing" also reports "emergency" and "landing". The regex is a
+    lookahead tried at each word start, so matches may overlap; it takes the
+    longest keyword starting there, and the shorter keywords that are
+    whole-word prefixes of it are added from a table built up front. Keyword
+    order is kept as priority for picking a primary match.
+    """
+
+    def __init__(self, keywords):
+        self.keywords = list(dict.fromkeys(k.strip().lower() for k in keywords if k.strip()))
+        self._priority = {keyword: i for i, keyword in enumerate(self.keywords)}
+        if self.keywords:
+            alternation = '|'.join(re.escape(k) for k in sorted(self.keywords, key=len, reverse=True))
+            self._pattern = re.compile(rf"(?<!\w)(?=({alternation})(?!\w))", re.IGNORECASE)
+        else:
+            self._pattern = None
+        # keyword -> the shorter keywords it starts with, ending on a word boundary
+        self._prefixes = {keyword: [other for other in self.keywords
+                                    if len(other) < len(keyword) and keyword.startswith(other)
+                                    and re.match(r"(?!\w)", keyword[len(other):])]
+                          for keyword in self.keywords}
+
+    def find_all(self, text):
+        """Distinct keywords found in text, in keyword-list priority order"""
+        if self._pattern is None or not text:
+            return []
+        found = set()
+        for match in self._pattern.finditer(text):
+            keyword = match.group(1).lower()
+            if keyword not in found:
+                found.add(keyword)
+                found.update(self._prefixes[keyword])
+        return sorted(found, key=self._priority.__getitem__)
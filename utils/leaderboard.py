@@ -0,0 +1,181 @@
+import bisect
+import heapq
+from datetime import datetime, timedelta, timezone
+
+OUTCOMES = {
+    'true': 'successful',
+    'partial': 'partial',
+    'false': 'unsuccessful'
+}
+
+# A pilot needs this many missions before they are ranked by success rate
+MIN_MISSIONS_FOR_RATE = 3
+# Windowed aggregates kept warm; beyond this the least recently used is dropped
+MAX_WINDOWS = 8
+
+COUNTED_FIELDS = ('total', 'successful', 'unsuccessful', 'partial', 'minutes')
+
+
+def new_stats(name):
+    return {
+        'name': name,
+        'total': 0,
+        'successful': 0,
+        'unsuccessful': 0,
+        'partial': 0,
+        'minutes': 0
+    }
+
+
+def success_rate(stats):
+    return (stats['successful'] / stats['total'] * 100) if stats['total'] > 0 else 0
+
+
+def mission_minutes(mission):
+    """Flight time of a finished mission in whole minutes"""
+    start = datetime.fromisoformat(mission['start_time'].replace('Z', '+00:00'))
+    end = datetime.fromisoformat(mission['end_time'].replace('Z', '+00:00'))
+    return max(int((end - start).total_seconds() // 60), 0)
+
+
+def rank_key(stats, metric):
+    """Sort key for a metric, or None if the pilot doesn't qualify"""
+    if metric == 'total':
+        return (stats['total'], stats['successful'])
+    if metric == 'success_rate':
+        if stats['total'] < MIN_MISSIONS_FOR_RATE:
+            return None
+        return (success_rate(stats), stats['total'])
+    if metric == 'minutes':
+        return (stats['minutes'], stats['total'])
+    raise ValueError(f"Unknown leaderboard metric: {metric}")
+
+
+class _Window:
+    """Per-pilot stats summed over the days first..last (ISO dates, inclusive)"""
+
+    __slots__ = ('first', 'last', 'stats', 'results')
+
+    def __init__(self, first, last):
+        self.first = first
+        self.last = last
+        self.stats = {}
+        self.results = {}  # (metric, limit) -> ranking, until the window next changes
+
+
+def _day(date, offset=0):
+    return (date + timedelta(days=offset)).isoformat()
+
+
+class LeaderboardIndex:
+    """Per-pilot mission stats kept current as missions start and end.
+
+    All-time rankings live in one sorted key list per metric, so the top N
+    is a slice. Stats are also bucketed per UTC day. Each window asked for
+    ("last N days") keeps a running total that bumps update in place; when
+    the date changes it adds the new day's bucket and subtracts the expired
+    ones, so a windowed ranking never re-sums the whole window. Rankings
+    are cached per window until its totals change.
+    """
+
+    METRICS = ('total', 'success_rate', 'minutes')
+
+    def __init__(self):
+        self.stats = {}
+        self.daily = {}
+        self._ranked = {metric: [] for metric in self.METRICS}
+        self._keys = {metric: {} for metric in self.METRICS}
+        self._windows = {}  # days -> _Window, least recently used first
+
+    def record_start(self, mission):
+        self.bump(mission['user_id'], mission['user_name'], mission['start_time'][:10], total=1)
+
+    def record_end(self, mission):
+        outcome = OUTCOMES.get(mission.get('success'))
+        deltas = {'minutes': mission_minutes(mission)}
+        if outcome:
+            deltas[outcome] = 1
+        self.bump(mission['user_id'], mission['user_name'], mission['start_time'][:10], **deltas)
+
+    def add_mission(self, mission):
+        """Count a mission loaded from storage (open or finished)"""
+        self.record_start(mission)
+        if mission.get('end_time'):
+            self.record_end(mission)
+
+    def bump(self, user_id, name, day, **deltas):
+        """Add counts to a pilot's all-time and per-day stats"""
+        stats = self.stats.setdefault(user_id, new_stats(name))
+        day_stats = self.daily.setdefault(day, {}).setdefault(user_id, new_stats(name))
+        for field, value in deltas.items():
+            stats[field] += value
+            day_stats[field] += value
+        if name:
+            stats['name'] = day_stats['name'] = name
+        self._rerank(user_id, stats)
+        for window in self._windows.values():
+            if window.first <= day <= window.last:
+                window_stats = window.stats.setdefault(user_id, new_stats(name))
+                for field, value in deltas.items():
+                    window_stats[field] += value
+                if name:
+                    window_stats['name'] = name
+                window.results.clear()
+
+    def _rerank(self, user_id, stats):
+        for metric in self.METRICS:
+            ranked = self._ranked[metric]
+            old = self._keys[metric].pop(user_id, None)
+            if old is not None:
+                del ranked[bisect.bisect_left(ranked, old)]
+            key = rank_key(stats, metric)
+            if key is not None:
+                entry = key + (user_id,)
+                bisect.insort(ranked, entry)
+                self._keys[metric][user_id] = entry
+
+    def top(self, metric='total', limit=10, days=None):
+        """Best pilots as (user_id, stats) pairs, all-time or over the last `days` days"""
+        if days is None:
+            entries = self._ranked[metric][-limit:][::-1] if limit else []
+            return [(entry[-1], self.stats[entry[-1]]) for entry in entries]
+
+        window = self._window(days, datetime.now(timezone.utc).date())
+        key = (metric, limit)
+        if key not in window.results:
+            ranked = ((rank_key(stats, metric), user_id) for user_id, stats in window.stats.items())
+            best = heapq.nlargest(limit, (item for item in ranked if item[0] is not None))
+            window.results[key] = [(user_id, window.stats[user_id]) for _, user_id in best]
+        return window.results[key]
+
+    def _window(self, days, today):
+        """The running aggregate for the last `days` days, rolled forward to today"""
+        first, last = _day(today, 1 - days), today.isoformat()
+        window = self._windows.pop(days, None)
+        if window is None or first > window.last or last < window.last:
+            # New, or so far behind (or the clock went back) that nothing carries over
+            window = _Window(first, last)
+            for offset in range(days):
+                self._merge(window, _day(today, -offset), 1)
+        elif window.last != last:
+            previous = datetime.fromisoformat(window.last).date()
+            for offset in range(1, (today - previous).days + 1):
+                self._merge(window, _day(previous, offset), 1)
+            old_first = datetime.fromisoformat(window.first).date()
+            for offset in range((datetime.fromisoformat(first).date() - old_first).days):
+                self._merge(window, _day(old_first, offset), -1)
+            window.first, window.last = first, last
+            window.results.clear()
+        self._windows[days] = window
+        while len(self._windows) > MAX_WINDOWS:
+            del self._windows[next(iter(self._windows))]
+        return window
+
+    def _merge(self, window, day, sign):
+        """Add (sign=1) or take away (sign=-1) one day's bucket"""
+        for user_id, day_stats in self.daily.get(day, {}).items():
+            stats = window.stats.setdefault(user_id, new_stats(day_stats['name']))
+            for field in COUNTED_FIELDS:
+                stats[field] += sign * day_stats[field]
+            if sign < 0 and not any(stats[field] for field in COUNTED_FIELDS):
+                del window.stats[user_id]
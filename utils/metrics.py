@@ -0,0 +1,160 @@
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Upper bounds of the histogram buckets; +Inf is implied. Most handlers finish well under 5ms, hence the sub-millisecond bounds
+LATENCY_BUCKETS = (0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PAYLOAD_BUCKETS = (64, 256, 1024, 4096, 16384, 65536)
+
+
+class Histogram:
+    """Fixed-bucket histogram, the same shape Prometheus scrapes"""
+
+    __slots__ = ('bounds', 'counts', 'sum', 'count', 'max')
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+        self.max = max(self.max, value)
+
+    def cumulative(self):
+        total = 0
+        for count in self.counts:
+            total += count
+            yield total
+
+    def quantile(self, q):
+        """Estimate, interpolating inside the bucket like histogram_quantile()"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        lower, seen = 0.0, 0
+        for bound, count in zip(self.bounds, self.counts):
+            if count and seen + count >= rank:
+                # Interpolation assumes values spread across the bucket; never report past the largest seen
+                return min(lower + (bound - lower) * (rank - seen) / count, self.max)
+            seen += count
+            lower = bound
+        # Falls in the +Inf bucket: the largest value seen is the best bound
+        return self.max
+
+
+class Timer:
+    __slots__ = ('started', 'error')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.error = False
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metrics:
+    """Latency, error and payload-size figures per handler.
+
+    Handlers are keyed by kind ("slash", "prefix", "event", "task") and
+    name. Everything runs on the event loop, so no locking is needed.
+    """
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.latency = {}   # (kind, name) -> Histogram of seconds
+        self.payloads = {}  # (kind, name) -> Histogram of request bytes
+        self.errors = {}    # (kind, name) -> count
+        self.gauges = {}    # metric name -> (help, value)
+
+    def observe(self, kind, name, seconds, error=False, payload_bytes=None):
+        key = (kind, name)
+        histogram = self.latency.get(key)
+        if histogram is None:
+            histogram = self.latency[key] = Histogram(LATENCY_BUCKETS)
+            self.errors[key] = 0
+        histogram.observe(seconds)
+        if error:
+            self.errors[key] += 1
+        if payload_bytes is not None:
+            payloads = self.payloads.get(key)
+            if payloads is None:
+                payloads = self.payloads[key] = Histogram(PAYLOAD_BUCKETS)
+            payloads.observe(payload_bytes)
+
+    @contextmanager
+    def timed(self, kind, name, payload_bytes=None):
+        """Time a block; an exception, or setting error on the yielded timer, counts as an error"""
+        timer = Timer()
+        try:
+            yield timer
+        except Exception:
+            timer.error = True
+            raise
+        finally:
+            self.observe(kind, name, time.perf_counter() - timer.started, timer.error, payload_bytes)
+
+    def set_gauge(self, name, help_text, value):
+        self.gauges[name] = (help_text, value)
+
+    def summary(self, limit=None):
+        """Per-handler rows, slowest p95 first"""
+        rows = []
+        for (kind, name), histogram in self.latency.items():
+            rows.append({
+                'kind': kind,
+                'name': name,
+                'calls': histogram.count,
+                'errors': self.errors[(kind, name)],
+                'mean': histogram.sum / histogram.count,
+                'p50': histogram.quantile(0.5),
+                'p95': histogram.quantile(0.95),
+                'max': histogram.max
+            })
+        rows.sort(key=lambda row: row['p95'], reverse=True)
+        return rows[:limit] if limit else rows
+
+    def _histogram_lines(self, metric, histograms):
+        for (kind, name), histogram in sorted(histograms.items()):
+            for bound, total in zip(histogram.bounds + ('+Inf',), histogram.cumulative()):
+                yield f"{metric}_bucket{_labels(kind=kind, name=name, le=bound)} {total}"
+            yield f"{metric}_sum{_labels(kind=kind, name=name)} {_number(histogram.sum)}"
+            yield f"{metric}_count{_labels(kind=kind, name=name)} {histogram.count}"
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format (version 0.0.4)"""
+        lines = [
+            '# HELP ems_handler_latency_seconds Time spent in a command, event or task handler.',
+            '# TYPE ems_handler_latency_seconds histogram',
+            *self._histogram_lines('ems_handler_latency_seconds', self.latency),
+            '# HELP ems_handler_errors_total Handler invocations that ended in an error.',
+            '# TYPE ems_handler_errors_total counter',
+            *(f"ems_handler_errors_total{_labels(kind=kind, name=name)} {count}"
+              for (kind, name), count in sorted(self.errors.items())),
+            '# HELP ems_handler_payload_bytes Size of the request that triggered a handler.',
+            '# TYPE ems_handler_payload_bytes histogram',
+            *self._histogram_lines('ems_handler_payload_bytes', self.payloads),
+            '# HELP ems_uptime_seconds Seconds since metrics collection started.',
+            '# TYPE ems_uptime_seconds gauge',
+            f"ems_uptime_seconds {_number(time.monotonic() - self.started)}"
+        ]
+        for name, (help_text, value) in sorted(self.gauges.items()):
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge", f"{name} {_number(value)}"]
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics()
@@ -0,0 +1,51 @@
+import discord
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Paginator(discord.ui.View):
+    """Previous/next buttons over embeds rendered on demand by `render(page)`"""
+
+    def __init__(self, render, page_count, owner_id, timeout=180):
+        super().__init__(timeout=timeout)
+        self.render = render
+        self.page_count = page_count
+        self.owner_id = owner_id
+        self.page = 0
+        self.message = None
+        self.update_buttons()
+
+    def update_buttons(self):
+        self.previous_page.disabled = self.page <= 0
+        self.next_page.disabled = self.page >= self.page_count - 1
+
+    async def interaction_check(self, interaction: discord.Interaction):
+        if interaction.user.id != self.owner_id:
+            await interaction.response.send_message("❌ Only the person who ran the command can change pages.", ephemeral=True)
+            return False
+        return True
+
+    async def show(self, interaction: discord.Interaction, page):
+        self.page = max(0, min(page, self.page_count - 1))
+        embed = await self.render(self.page)
+        self.update_buttons()
+        await interaction.response.edit_message(embed=embed, view=self)
+
+    @discord.ui.button(label="◀ Previous", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.show(interaction, self.page - 1)
+
+    @discord.ui.button(label="Next ▶", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.show(interaction, self.page + 1)
+
+    async def on_timeout(self):
+        if self.message is None:
+            return
+        for item in self.children:
+            item.disabled = True
+        try:
+            await self.message.edit(view=self)
+        except discord.HTTPException as e:
+            logger.debug(f"Could not disable expired page buttons: {e}")
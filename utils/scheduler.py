@@ -0,0 +1,63 @@
+import heapq
+import itertools
+
+
+class TimerHeap:
+    """Min-heap of (due timestamp, key) with O(log n) scheduling.
+
+    Rescheduling or removing a key marks its old entry dead instead of
+    searching the heap; dead entries are skipped when they reach the top
+    and swept out once they make up half the heap.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._entries = {}
+        self._counter = itertools.count()
+        self._dead = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def schedule(self, key, due):
+        """Set (or move) the due time of a key"""
+        self.remove(key)
+        entry = [due, next(self._counter), key, True]
+        self._entries[key] = entry
+        heapq.heappush(self._heap, entry)
+
+    def remove(self, key):
+        """Forget a key; no-op if it isn't scheduled"""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        entry[-1] = False
+        self._dead += 1
+        if self._dead > 64 and self._dead * 2 > len(self._heap):
+            self._heap = [entry for entry in self._heap if entry[-1]]
+            heapq.heapify(self._heap)
+            self._dead = 0
+
+    def _drop_dead(self):
+        while self._heap and not self._heap[0][-1]:
+            heapq.heappop(self._heap)
+            self._dead -= 1
+
+    def next_due(self):
+        """Earliest due timestamp, or None when nothing is scheduled"""
+        self._drop_dead()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now):
+        """Remove and return every key due at or before `now`, earliest first"""
+        due = []
+        self._drop_dead()
+        while self._heap and self._heap[0][0] <= now:
+            entry = heapq.heappop(self._heap)
+            del self._entries[entry[2]]
+            due.append(entry[2])
+            self._drop_dead()
+        return due
@@ -0,0 +1,127 @@
+import heapq
+import math
+import re
+from collections import Counter
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset("""
+a about an and are as at be by can do does for from how i if in is it me my
+of on or should the this to what when where which who why with you your
+""".split())
+
+# Longest suffix first; (suffix, replacement)
+_SUFFIXES = (
+    ('ational', 'ate'), ('ization', 'ize'), ('fulness', 'ful'), ('iveness', 'ive'),
+    ('ousness', 'ous'), ('ations', 'ate'), ('ation', 'ate'), ('ments', ''), ('ment', ''),
+    ('ness', ''), ('ings', ''), ('ing', ''), ('ies', 'y'), ('ied', 'y'), ('sses', 'ss'),
+    ('edly', ''), ('ed', ''), ('ly', ''), ('es', ''), ('s', ''),
+)
+
+
+def stem(word):
+    """Light suffix-stripping stemmer: landing/landed/lands -> land, fires -> fire"""
+    if len(word) <= 3 or word.isdigit():
+        return word
+    for suffix, replacement in _SUFFIXES:
+        if word.endswith(suffix):
+            root = word[:len(word) - len(suffix)] + replacement
+            if len(root) < 3 or not any(c in 'aeiouy' for c in root):
+                return word
+            if suffix == 's' and word.endswith(('ss', 'us', 'is')):
+                return word
+            if suffix == 'es' and not word.endswith(('ches', 'shes', 'xes', 'zes')):
+                # "fires", "engines": only the s goes
+                root = word[:-1]
+            # "stopped" -> "stop", "running" -> "run"
+            if suffix in ('ed', 'ing', 'ings', 'edly') and len(root) > 3 and root[-1] == root[-2] and root[-1] not in 'lsz':
+                root = root[:-1]
+            return root
+    return word
+
+
+def tokenize(text):
+    """Lowercased, stemmed terms with stopwords dropped"""
+    return [stem(token) for token in TOKEN_RE.findall(text.lower()) if token not in STOPWORDS]
+
+
+class BM25Index:
+    """Inverted index with BM25 ranking over documents made of weighted fields.
+
+    Each document is a dict of field name -> text (or list of texts); a
+    term's frequency in a document is the sum of its per-field counts times
+    the field weight, so a keyword hit counts for more than a mention in a
+    procedure step. Queries only touch the postings of their own terms.
+    """
+
+    def __init__(self, field_weights, k1=1.2, b=0.75):
+        self.field_weights = field_weights
+        self.k1 = k1
+        self.b = b
+        self.postings = {}
+        self.doc_terms = {}
+        self.doc_lengths = {}
+        self.total_length = 0.0
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    def __contains__(self, key):
+        return key in self.doc_lengths
+
+    def term_counts(self, fields):
+        """Field-weighted term frequencies for one document"""
+        counts = Counter()
+        for field, weight in self.field_weights.items():
+            value = fields.get(field)
+            if not value:
+                continue
+            texts = value if isinstance(value, (list, tuple)) else (value,)
+            for text in texts:
+                for term in tokenize(str(text)):
+                    counts[term] += weight
+        return counts
+
+    def add(self, key, fields):
+        """Index (or re-index) a document under a hashable key"""
+        self.add_terms(key, self.term_counts(fields))
+
+    def add_terms(self, key, counts):
+        """Index a document from precomputed term counts (e.g. loaded from disk)"""
+        self.remove(key)
+        length = sum(counts.values())
+        self.doc_lengths[key] = length
+        self.total_length += length
+        self.doc_terms[key] = tuple(counts)
+        for term, frequency in counts.items():
+            self.postings.setdefault(term, {})[key] = frequency
+
+    def remove(self, key):
+        length = self.doc_lengths.pop(key, None)
+        if length is None:
+            return
+        self.total_length -= length
+        for term in self.doc_terms.pop(key):
+            docs = self.postings[term]
+            del docs[key]
+            if not docs:
+                del self.postings[term]
+
+    def search(self, query, limit=3, accept=None):
+        """Best (score, key) pairs for a free-text query, highest first; `accept(key)` filters documents"""
+        if not self.doc_lengths:
+            return []
+        doc_count = len(self.doc_lengths)
+        average_length = (self.total_length / doc_count) or 1.0
+        scores = {}
+        for term in set(tokenize(query)):
+            docs = self.postings.get(term)
+            if not docs:
+                continue
+            idf = math.log(1 + (doc_count - len(docs) + 0.5) / (len(docs) + 0.5))
+            for key, frequency in docs.items():
+                if accept is not None and not accept(key):
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[key] / average_length)
+                scores[key] = scores.get(key, 0.0) + idf * frequency * (self.k1 + 1) / (frequency + norm)
+        return heapq.nlargest(limit, ((score, key) for key, score in scores.items()), key=lambda item: item[0])
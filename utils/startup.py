@@ -0,0 +1,64 @@
+import time
+from contextlib import contextmanager
+
+# Phases a component can report, in display order. "import" isn't timed
+# directly: loading an extension imports the module synchronously and
+# then calls setup(), so it is the gap between the start of "load" and
+# the start of "construct".
+PHASES = ('import', 'construct', 'data load', 'tree sync')
+
+
+class StartupProfile:
+    """Wall-clock timings of startup phases per component (cog or the bot itself)"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.finished = None
+        self.timings = {}  # component -> {phase: seconds}
+        self.starts = {}   # (component, phase) -> perf_counter at first start
+
+    @contextmanager
+    def timed(self, component, phase):
+        start = time.perf_counter()
+        self.starts.setdefault((component, phase), start)
+        try:
+            yield
+        finally:
+            self.record(component, phase, time.perf_counter() - start)
+
+    def record(self, component, phase, seconds):
+        phases = self.timings.setdefault(component, {})
+        phases[phase] = phases.get(phase, 0.0) + seconds
+
+    def finish(self):
+        self.finished = time.perf_counter()
+
+    @property
+    def total(self):
+        return (self.finished or time.perf_counter()) - self.started
+
+    def component_phases(self, component):
+        """Timed phases of one component, with import derived from the extension load"""
+        phases = dict(self.timings.get(component, {}))
+        phases.pop('load', None)
+        load_start = self.starts.get((component, 'load'))
+        construct_start = self.starts.get((component, 'construct'))
+        if load_start is not None and construct_start is not None:
+            phases['import'] = construct_start - load_start
+        return {phase: phases[phase] for phase in PHASES if phase in phases}
+
+    def slowest(self, limit=None):
+        """(component, seconds) pairs, slowest first"""
+        totals = [(component, sum(self.component_phases(component).values())) for component in self.timings]
+        totals.sort(key=lambda item: item[1], reverse=True)
+        return totals[:limit] if limit else totals
+
+    def report(self):
+        lines = [f"Startup took {self.total:.2f}s"]
+        for component, seconds in self.slowest():
+            phases = ', '.join(f"{phase} {value * 1000:.0f}ms" for phase, value in self.component_phases(component).items())
+            lines.append(f"  {component}: {seconds * 1000:.0f}ms ({phases})")
+        return '\n'.join(lines)
+
+
+profile = StartupProfile()
@@ -0,0 +1,238 @@
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import weakref
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Every store created by a cog, so shutdown and health checks can reach them
+_stores = weakref.WeakSet()
+
+
+def write_atomic(path, payload):
+    """Write text to path via a temp file + rename so readers never see a partial file"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class JSONStore:
+    """JSON file persisted off the event loop with coalesced, atomic writes.
+
+    Cogs keep their data in memory and call ``save(snapshot)`` after each
+    change. The first call schedules a flush ``delay`` seconds later; any
+    calls made before that flush runs are folded into it, so a burst of
+    commands costs one write instead of one per command.
+    """
+
+    def __init__(self, path, default=dict, delay=1.0):
+        self.path = Path(path)
+        self.default = default
+        self.delay = delay
+        self.writes = 0
+        self._snapshot = None
+        self._dirty = False
+        self._writing = False
+        self._task = None
+        self._lock = asyncio.Lock()
+        _stores.add(self)
+
+    @property
+    def pending(self):
+        """True while a change is waiting to reach disk"""
+        return self._dirty or self._writing
+
+    def load(self):
+        """Read the file, creating it with the default value if missing"""
+        if not self.path.exists():
+            data = self.default()
+            write_atomic(self.path, json.dumps(data))
+            return data
+        with open(self.path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def save(self, snapshot):
+        """Schedule snapshot() to be written; returns immediately"""
+        self._snapshot = snapshot
+        self._dirty = True
+        if self._task is not None and not self._task.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No loop (CLI tools, migrations) - write straight through
+            self._dirty = False
+            self._write(self._serialize(snapshot))
+            return
+        self._task = loop.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.delay)
+        await self.flush()
+
+    async def flush(self):
+        """Write any pending snapshot now; returns False if a write failed"""
+        ok = True
+        async with self._lock:
+            while self._dirty:
+                self._dirty = False
+                self._writing = True
+                try:
+                    # Serialize here on the loop, where the cogs can't change the data mid-dump;
+                    # only the finished text goes to the thread
+                    payload = self._serialize(self._snapshot)
+                    await asyncio.to_thread(self._write, payload)
+                except Exception as e:
+                    logger.error(f"Error writing {self.path}: {e}")
+                    ok = False
+                finally:
+                    self._writing = False
+        return ok
+
+    @staticmethod
+    def _serialize(snapshot):
+        return json.dumps(snapshot(), separators=(',', ':'))
+
+    def _write(self, payload):
+        write_atomic(self.path, payload)
+        self.writes += 1
+
+
+class EventLog:
+    """Append-only JSON-lines log; each event costs one line instead of a full rewrite.
+
+    Appends are buffered and written together by a worker thread. ``rotate``
+    moves the live log aside so the owner can write a snapshot and then
+    ``discard_rotated``; if that is interrupted, ``replay`` still yields the
+    rotated events first, so events must be safe to apply twice.
+    """
+
+    def __init__(self, path, delay=0.1):
+        self.path = Path(path)
+        self.rotated_path = self.path.with_name(self.path.name + '.1')
+        self.delay = delay
+        self.size = self.path.stat().st_size if self.path.exists() else 0
+        self.writes = 0
+        self._buffer = []
+        self._writing = False
+        self._task = None
+        self._lock = asyncio.Lock()
+        _stores.add(self)
+
+    @property
+    def pending(self):
+        """True while appended events are waiting to reach disk"""
+        return bool(self._buffer) or self._writing
+
+    def replay(self):
+        """Yield every logged event in order, skipping unreadable lines"""
+        for path in (self.rotated_path, self.path):
+            if not path.exists():
+                continue
+            with open(path, 'r', encoding='utf-8') as f:
+                for line_number, line in enumerate(f, 1):
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        logger.warning(f"Skipping corrupt line {line_number} in {path}")
+
+    def append(self, event):
+        """Queue an event for writing; returns immediately"""
+        line = json.dumps(event, separators=(',', ':')) + '\n'
+        self._buffer.append(line)
+        self.size += len(line)
+        if self._task is not None and not self._task.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._write(self._take())
+            return
+        self._task = loop.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.delay)
+        await self.flush()
+
+    async def flush(self):
+        """Write buffered events now"""
+        async with self._lock:
+            await self._flush_locked()
+
+    async def _flush_locked(self):
+        while self._buffer:
+            payload = self._take()
+            self._writing = True
+            try:
+                await asyncio.to_thread(self._write, payload)
+            except Exception as e:
+                logger.error(f"Error appending to {self.path}: {e}")
+            finally:
+                self._writing = False
+
+    def _take(self):
+        payload = ''.join(self._buffer)
+        self._buffer = []
+        return payload
+
+    def _write(self, payload):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        self.writes += 1
+
+    async def rotate(self):
+        """Flush and move the live log aside; new events go to a fresh file"""
+        async with self._lock:
+            await self._flush_locked()
+            # Everything counted so far is on disk and moves aside; events appended while
+            # the rename runs stay buffered for the new file and keep their share of the size
+            rotated = self.size
+            await asyncio.to_thread(self._rotate)
+            self.size -= rotated
+
+    def _rotate(self):
+        if not self.path.exists():
+            return
+        if self.rotated_path.exists():
+            # A previous compaction never finished; keep its events ahead of ours
+            with open(self.path, 'r', encoding='utf-8') as src, open(self.rotated_path, 'a', encoding='utf-8') as dst:
+                dst.write(src.read())
+            self.path.unlink()
+        else:
+            os.replace(self.path, self.rotated_path)
+
+    def discard_rotated(self):
+        """Drop the rotated log once its events are covered by a snapshot"""
+        self.rotated_path.unlink(missing_ok=True)
+
+
+def pending_stores():
+    """Stores with changes not yet on disk"""
+    return [store for store in _stores if store.pending]
+
+
+async def flush_all():
+    """Flush every store; called on shutdown"""
+    for store in list(_stores):
+        await store.flush()
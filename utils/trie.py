@@ -0,0 +1,103 @@
+import re
+
+WORD_START_RE = re.compile(r"[a-z0-9]+")
+
+# Hard cap on nodes walked per lookup, so a filter that rejects most
+# entries can't turn an autocomplete call into a full scan
+MAX_VISITS = 5000
+# Characters indexed from each word start. Indexing whole suffixes made a
+# long label cost (words x length) nodes; longer prefixes are walked this
+# far and then checked against the label itself.
+MAX_KEY_CHARS = 24
+
+
+class _Node:
+    __slots__ = ('children', 'values')
+
+    def __init__(self):
+        self.children = {}
+        self.values = {}  # insertion-ordered set
+
+
+class PrefixTrie:
+    """Case-insensitive prefix lookup for autocomplete.
+
+    Every word start of a label is indexed, so "fail" finds "Engine
+    Failure" as well as "Failure Modes". Lookups walk the prefix and then
+    the subtree in order until `limit` values are found, so their cost
+    depends on the prefix and the limit rather than the number of entries.
+    """
+
+    def __init__(self):
+        self.root = _Node()
+        self._labels = {}
+
+    def __len__(self):
+        return len(self._labels)
+
+    def __contains__(self, value):
+        return value in self._labels
+
+    @staticmethod
+    def keys_for(label, length=None):
+        label = label.lower()
+        return list(dict.fromkeys(label[match.start():][:length] for match in WORD_START_RE.finditer(label)))
+
+    def insert(self, label, value):
+        """Index value under label (replacing any earlier label for it)"""
+        self.remove(value)
+        label = str(label)
+        self._labels[value] = label
+        for key in self.keys_for(label, MAX_KEY_CHARS):
+            node = self.root
+            for char in key:
+                node = node.children.setdefault(char, _Node())
+            node.values[value] = None
+
+    def remove(self, value):
+        label = self._labels.pop(value, None)
+        if label is None:
+            return
+        for key in self.keys_for(label, MAX_KEY_CHARS):
+            path = [self.root]
+            for char in key:
+                path.append(path[-1].children[char])
+            path[-1].values.pop(value, None)
+            # Prune branches that no longer lead anywhere
+            for depth in range(len(key), 0, -1):
+                node = path[depth]
+                if node.values or node.children:
+                    break
+                del path[depth - 1].children[key[depth - 1]]
+
+    def complete(self, prefix, limit=25, accept=None):
+        """Up to `limit` values whose label has a word starting with prefix, in alphabetical order"""
+        prefix = prefix.lower().lstrip()
+        if len(prefix) > MAX_KEY_CHARS:
+            accept = self._long_prefix_filter(prefix, accept)
+        node = self.root
+        for char in prefix[:MAX_KEY_CHARS]:
+            node = node.children.get(char)
+            if node is None:
+                return []
+        results, seen, visits = [], set(), 0
+        stack = [node]
+        while stack and visits < MAX_VISITS:
+            node = stack.pop()
+            visits += 1
+            for value in node.values:
+                if value in seen or (accept is not None and not accept(value)):
+                    continue
+                seen.add(value)
+                results.append(value)
+                if len(results) == limit:
+                    return results
+            stack.extend(node.children[char] for char in sorted(node.children, reverse=True))
+        return results
+
+    def _long_prefix_filter(self, prefix, accept):
+        def matches(value):
+            if not any(key.startswith(prefix) for key in self.keys_for(self._labels[value])):
+                return False
+            return accept is None or accept(value)
+        return matches
@@ -0,0 +1,118 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from datetime import datetime, timezone
+from pathlib import Path
+
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# How often the loop checks in; also the resolution of the lag figures
+TICK_SECONDS = 0.1
+# A callback that holds the loop longer than this is reported with its stack; SLOW_CALLBACK_SECONDS overrides it
+DEFAULT_SLOW_CALLBACK_SECONDS = 0.5
+# Innermost frames logged per captured stack
+STACK_DEPTH = 15
+RECENT_STALLS = 20
+
+PROJECT_ROOT = str(Path(__file__).resolve().parent.parent)
+
+
+def blocking_site(stack):
+    """Innermost frame in this project's code, which is usually the one to fix"""
+    for frame in reversed(stack):
+        if frame.filename.startswith(PROJECT_ROOT) and 'site-packages' not in frame.filename:
+            return f"{os.path.relpath(frame.filename, PROJECT_ROOT)}:{frame.lineno} in {frame.name}"
+    if stack:
+        return f"{stack[-1].filename}:{stack[-1].lineno} in {stack[-1].name}"
+    return None
+
+
+class LoopWatchdog:
+    """Measures event loop lag and catches callbacks that block it.
+
+    A task on the loop wakes every TICK_SECONDS and records how late it
+    was. A daemon thread watches that heartbeat; once it is overdue by
+    more than the threshold, the loop is stuck inside some callback, so
+    the thread logs the loop thread's stack while it is still blocked
+    (so a stall long enough to drop the gateway is visible as it happens).
+    When the loop gets going again the tick logs the total stall time and
+    records it in utils.metrics.
+    """
+
+    def __init__(self, threshold=None, interval=TICK_SECONDS):
+        # Read here rather than at import, so a value from .env (loaded after the imports) applies
+        if threshold is None:
+            threshold = float(os.getenv('SLOW_CALLBACK_SECONDS', DEFAULT_SLOW_CALLBACK_SECONDS))
+        self.threshold = threshold
+        self.interval = interval
+        self.last = 0.0
+        self.peak = 0.0
+        self.stalls = 0
+        self.recent = deque(maxlen=RECENT_STALLS)
+        self.heartbeat = time.monotonic()
+        self.captured = None  # (heartbeat, blocking site) noted by the watcher thread
+        self.loop_thread_id = None
+        self.task = None
+        self.thread = None
+        self.stopping = threading.Event()
+
+    def start(self):
+        self.loop_thread_id = threading.get_ident()
+        self.heartbeat = time.monotonic()
+        self.task = asyncio.create_task(self.run())
+        self.stopping.clear()
+        self.thread = threading.Thread(target=self.watch, name='loop-watchdog', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopping.set()
+        if self.task:
+            self.task.cancel()
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            self.last = max(loop.time() - started - self.interval, 0.0)
+            self.peak = max(self.peak, self.last)
+            stalled_since = self.heartbeat
+            self.heartbeat = time.monotonic()
+            if self.last >= self.threshold:
+                self.report_stall(self.last, stalled_since)
+
+    def watch(self):
+        """Watcher thread: snapshot the loop thread's stack while it is blocked"""
+        check_every = min(self.threshold / 2, self.interval)
+        while not self.stopping.wait(check_every):
+            heartbeat = self.heartbeat
+            overdue = time.monotonic() - heartbeat - self.interval
+            if overdue < self.threshold or (self.captured and self.captured[0] == heartbeat):
+                continue
+            frame = sys._current_frames().get(self.loop_thread_id)
+            if frame is None:
+                continue
+            stack = traceback.extract_stack(frame)
+            where = blocking_site(stack)
+            self.captured = (heartbeat, where)
+            logger.warning(f"Event loop blocked for {overdue * 1000:.0f}ms so far, at {where}:\n"
+                           f"{''.join(traceback.format_list(stack[-STACK_DEPTH:]))}")
+
+    def report_stall(self, seconds, stalled_since):
+        captured, self.captured = self.captured, None
+        where = captured[1] if captured and captured[0] == stalled_since else None
+        self.stalls += 1
+        self.recent.append({
+            'at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'ms': round(seconds * 1000),
+            'where': where
+        })
+        metrics.observe('loop', 'blocked', seconds)
+        logger.warning(f"Event loop was blocked for {seconds * 1000:.0f}ms" + (f" at {where}" if where else ""))